@@ -1,9 +1,13 @@
+import numpy as np
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import sys
 import json
 import argparse
+from catalog_preprocessing import classify_power_usage, clean_text
+from model_artifacts import catalog_fingerprint, save_model, load_model
+from tfidf_precision import compact, matrix_nbytes, ranking_recall, row_scores, score_matrix, stored_precision
+from wire_format import dumps_json, loads_json
 
 # Redirect print to stderr for debugging (so JSON output to stdout is clean)
 def debug_print(*args, **kwargs):
@@ -13,29 +17,29 @@ def debug_print(*args, **kwargs):
 import os
 DATA_FILE = os.getenv('PRODUCTS_CSV_PATH', 'products.csv')
 RECOMMENDATION_COUNT = 5
+# Directory for persisted model artifacts used by --serve (disabled when empty); kept
+# apart from python_server's MODEL_ARTIFACT_DIR, whose artifacts this cannot load
+MODEL_ARTIFACT_DIR = os.getenv('AITOOLS_ARTIFACT_DIR', '')
+# Engine stamp of the artifacts this script writes and loads
+ARTIFACT_ENGINE = 'aitools2'
+# Prepared fields kept in the artifacts (everything get_recommendations reads)
+ARTIFACT_COLUMNS = ['Product', 'Brand', 'Application', 'PowerUsage', 'Image_URL']
 # Weights for the Hybrid Score (must sum to 1.0, or 100)
 WEIGHT_APP = 0.40  # 40% for Application Match
 WEIGHT_POWER = 0.40 # 40% for PowerUsage Match
 WEIGHT_DESC = 0.20  # 20% for Description Similarity
+# Brand diversity of the results: at most this many products per brand (0 keeps the
+# classic rule: the top N, then the best product of each brand not among them)
+BRAND_CAP = int(os.getenv('BRAND_CAP', '0'))
+# MMR-style penalty: score subtracted per better product of the same brand already picked (0 disables)
+BRAND_PENALTY = float(os.getenv('BRAND_PENALTY', '0'))
+# Storage of the TF-IDF rows: float64, float32 or int8 with a per-row scale (see tfidf_precision)
+TFIDF_PRECISION = os.getenv('TFIDF_PRECISION', 'float64').lower()
 # ---
 
-# --- 2. CLASSIFICATION FUNCTION (UNCHANGED) ---
-
-def determine_power_usage(row):
-    """Classifies a product's power usage (High, Medium, Low) based on Motor Rating (kw)."""
-    motor_rating_col = 'Motor Rating (kw)'
-    try:
-        motor_rating = str(row[motor_rating_col]).split('/')[0].strip()
-        motor_rating = float(motor_rating)
-    except Exception:
-        return 'medium'
-    
-    if motor_rating >= 5.5:
-        return 'high'
-    elif motor_rating >= 2.0:
-        return 'medium'
-    else:
-        return 'low'
+# --- 2. CLASSIFICATION ---
+# PowerUsage (High, Medium, Low) from Motor Rating (kw) is classified column-wise
+# by catalog_preprocessing.classify_power_usage, shared with python_server.py
 
 # --- 3. DATA LOADING AND PREPROCESSING ---
 def load_data_from_csv(file_path):
@@ -55,13 +59,91 @@ def load_data_from_json(json_str):
         print(f"Error: Invalid JSON data: {e}")
         sys.exit(1)
 
+# Input fields read by preprocess_data/train_model; streamed catalogs keep only these
+MODEL_INPUT_COLUMNS = [
+    'Product', 'Brand', 'Type', 'Subtype', 'Image_URL',
+    'Application', 'Applications', 'Product_Details', 'Description',
+    'Motor Rating (kw)', 'Motor_Rating_kW', 'Motor Rating(kW)'
+]
+
+def iter_json_records(stream, chunk_size=65536):
+    """
+    Yield records from a JSON array or NDJSON stream without reading it whole.
+
+    Records are decoded one at a time from a rolling buffer, so only the
+    current chunk and the record being parsed are held as text.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    in_array = None
+
+    while True:
+        # Skip whitespace (and commas between array elements)
+        while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ',')):
+            pos += 1
+
+        if pos >= len(buffer):
+            if eof:
+                if in_array:
+                    raise json.JSONDecodeError("Unterminated JSON array", buffer, pos)
+                return
+            buffer = buffer[pos:] + stream.read(chunk_size)
+            pos = 0
+            eof = len(buffer) == 0
+            continue
+
+        if in_array is None:
+            in_array = buffer[pos] == '['
+            if in_array:
+                pos += 1
+            continue
+
+        if in_array and buffer[pos] == ']':
+            return
+
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Record continues in the next chunk
+            chunk = stream.read(chunk_size)
+            eof = len(chunk) == 0
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        yield record
+        pos = end
+        if pos > chunk_size:
+            buffer = buffer[pos:]
+            pos = 0
+
+def load_data_from_stream(stream):
+    """Load data from a streamed JSON array or NDJSON, keeping only the model's columns"""
+    columns = {name: [] for name in MODEL_INPUT_COLUMNS}
+    present = set()
+    try:
+        for record in iter_json_records(stream):
+            for name, values in columns.items():
+                values.append(record.get(name, np.nan))
+            present.update(record.keys())
+    except json.JSONDecodeError as e:
+        print(f"Error: Invalid JSON data: {e}")
+        sys.exit(1)
+
+    # Absent keys become NaN and columns missing from every record stay missing, as with pd.DataFrame(records)
+    return pd.DataFrame({name: values for name, values in columns.items() if name in present})
+
 # Initially set df to None, will be loaded based on input method
 df = None
 
-def preprocess_data(dataframe):
+def preprocess_data(dataframe, copy=True):
     """Preprocess and prepare data for recommendations"""
-    # Create a copy to avoid modifying original
-    df = dataframe.copy()
+    # Create a copy to avoid modifying original (streamed frames are owned, no copy needed)
+    df = dataframe.copy() if copy else dataframe
 
     debug_print(f"DEBUG: Input columns: {list(df.columns)}")
     debug_print(f"DEBUG: DataFrame shape: {df.shape}")
@@ -98,7 +180,7 @@ def preprocess_data(dataframe):
         df['Motor Rating (kw)'] = 0
 
     # **STEP 3B: FEATURE ENGINEERING (CREATING PowerUsage)**
-    df['PowerUsage'] = df.apply(determine_power_usage, axis=1)
+    df['PowerUsage'] = classify_power_usage(df['Motor Rating (kw)'])
 
     # **STEP 3C: DATA CLEANING & TOKENIZATION**
     # Convert all text to lowercase for exact matching - Process each column safely
@@ -114,33 +196,33 @@ def preprocess_data(dataframe):
 
     debug_print(f"DEBUG: Column names AFTER removing duplicates: {df.columns.tolist()}")
 
-    # Application - using safer apply method
+    # Application
     if 'Application' in df.columns:
-        df['Application'] = df['Application'].fillna('').apply(lambda x: str(x).lower())
+        df['Application'] = clean_text(df['Application'], lower=True)
     else:
         df['Application'] = ''
 
     # PowerUsage
     if 'PowerUsage' in df.columns:
-        df['PowerUsage'] = df['PowerUsage'].fillna('').apply(lambda x: str(x).lower())
+        df['PowerUsage'] = clean_text(df['PowerUsage'], lower=True)
     else:
         df['PowerUsage'] = 'medium'
 
     # Product_Details
     if 'Product_Details' in df.columns:
-        df['Product_Details'] = df['Product_Details'].fillna('').apply(lambda x: str(x).lower())
+        df['Product_Details'] = clean_text(df['Product_Details'], lower=True)
     else:
         df['Product_Details'] = ''
 
     # Product
     if 'Product' in df.columns:
-        df['Product'] = df['Product'].fillna('Unknown Product').apply(str)
+        df['Product'] = clean_text(df['Product'], 'Unknown Product')
     else:
         df['Product'] = 'Unknown Product'
 
     # Brand
     if 'Brand' in df.columns:
-        df['Brand'] = df['Brand'].fillna('Unknown Brand').apply(str)
+        df['Brand'] = clean_text(df['Brand'], 'Unknown Brand')
     else:
         df['Brand'] = 'Unknown Brand'
 
@@ -205,11 +287,168 @@ def train_model(dataframe):
     return tfidf_desc, tfidf_matrix_desc
 
 
+# --- 4. PRECOMPUTED MATCH ARRAYS ---
+def build_match_arrays(dataframe):
+    """
+    Precompute per-catalog categorical arrays for the hybrid score.
+
+    Application and PowerUsage are factorized into integer codes so each query
+    only checks the distinct values and broadcasts the result over the catalog.
+    Brands get codes too, with the catalog grouped by brand (brand_order) for
+    the diversity stage; the result fields are kept as arrays so only the final
+    rows are ever materialized.
+    """
+    app_codes, app_values = pd.factorize(dataframe['Application'])
+    power_codes, power_values = pd.factorize(dataframe['PowerUsage'])
+    brand_codes, brand_values = pd.factorize(dataframe['Brand'])
+    return {
+        'app_codes': app_codes,
+        'app_values': np.asarray(app_values, dtype=object),
+        'power_codes': power_codes,
+        'power_values': np.asarray(power_values, dtype=object),
+        'brands': dataframe['Brand'].to_numpy(dtype=object),
+        'brand_codes': brand_codes,
+        'brand_count': len(brand_values),
+        'brand_order': np.argsort(brand_codes, kind='stable'),
+        'products': dataframe['Product'].to_numpy(dtype=object),
+        'applications': dataframe['Application'].to_numpy(dtype=object),
+        'power_usages': dataframe['PowerUsage'].to_numpy(dtype=object),
+        'image_urls': dataframe['Image_URL'].to_numpy(dtype=object) if 'Image_URL' in dataframe.columns else None,
+    }
+
+def top_indices(scores, count):
+    """Indices of the `count` best scores, best first (lower index first on ties)"""
+    if count >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    kth = scores[np.argpartition(-scores, count - 1)[count - 1]]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:count - len(above)]
+    selected = np.concatenate([above, ties])
+    return selected[np.argsort(-scores[selected], kind='stable')]
+
+def sort_by_score(indices, scores):
+    """indices ordered by descending scores (lower index first on ties)"""
+    return indices[np.lexsort((indices, -scores))]
+
+def best_per_brand(scores, order, codes):
+    """
+    Positions in `order` of each brand's best row (lowest index on ties).
+
+    order lists row indices grouped by brand (in ascending index within a
+    brand) and codes holds their brand codes; one segmented max finds every
+    brand's best without sorting any scores.
+    """
+    if len(order) == 0:
+        return np.empty(0, dtype=np.intp)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    values = scores[order]
+    best = np.maximum.reduceat(values, starts)
+    positions = np.flatnonzero(values == np.repeat(best, np.diff(np.r_[starts, len(values)])))
+    first = np.r_[True, codes[positions[1:]] != codes[positions[:-1]]]
+    return positions[first]
+
+def diversify(scores, match_arrays, count, brand_cap=0, brand_penalty=0.0):
+    """
+    Pick `count` brand-diverse rows by score, returned in rank order.
+
+    With no cap or penalty this is the classic rule: the top `count` rows,
+    followed by the best row of each brand missing from them (best first)
+    until `count` brands are represented. With brand_cap, at most that many
+    rows per brand are picked; with brand_penalty, the r-th row picked from a
+    brand competes with its score lowered by r * brand_penalty (MMR-style).
+
+    Work is one partial selection plus one segmented max per round of
+    per-brand picks, so it does not grow with how much a few brands dominate
+    the top of the ranking. Rows that can no longer make the cut are dropped
+    between rounds.
+    """
+    if count <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.intp)
+    brand_codes = match_arrays['brand_codes']
+    order = match_arrays['brand_order']
+
+    if brand_cap <= 0 and brand_penalty <= 0:
+        head = top_indices(scores, count)
+        seen = np.zeros(match_arrays['brand_count'], dtype=bool)
+        seen[brand_codes[head]] = True
+        missing = count - int(seen.sum())
+        if missing <= 0:
+            return head
+        order = order[~seen[brand_codes[order]]]
+        extras = order[best_per_brand(scores, order, brand_codes[order])]
+        return np.concatenate([head, sort_by_score(extras, scores[extras])[:missing]])
+
+    codes = brand_codes[order]
+    rounds = brand_cap if brand_cap > 0 else count
+    picked, adjusted = [], []
+    for r in range(rounds):
+        positions = best_per_brand(scores, order, codes)
+        if len(positions) == 0:
+            break
+        picked.append(order[positions])
+        adjusted.append(scores[order[positions]] - brand_penalty * r)
+        keep = np.ones(len(order), dtype=bool)
+        keep[positions] = False
+        candidates = np.concatenate(adjusted)
+        if len(candidates) >= count:
+            # A later pick scores at most its score minus the next round's penalty
+            floor = np.partition(candidates, len(candidates) - count)[len(candidates) - count]
+            keep &= scores[order] - brand_penalty * (r + 1) >= floor
+        order, codes = order[keep], codes[keep]
+
+    picked = np.concatenate(picked)
+    return picked[np.lexsort((picked, -np.concatenate(adjusted)))][:count]
+
 # --- 5. RECOMMENDATION FUNCTION (HYBRID SCORING) ---
-def get_recommendations(user_application, user_power_usage, user_description, dataframe, tfidf_vectorizer, tfidf_matrix, top_n=RECOMMENDATION_COUNT, output_json=False):
+def rank_products(user_app, user_power, desc_similarity, match_arrays, top_n=RECOMMENDATION_COUNT, brand_cap=BRAND_CAP, brand_penalty=BRAND_PENALTY):
+    """
+    Combine the hybrid score components for one query and pick brand-diverse results.
+
+    user_app/user_power are already lowercased; desc_similarity is the query's
+    cosine similarity against every catalog row.
+    """
+    # 3. Calculate Categorical Match Score (80% Weight)
+
+    # Part A: Application Match Score (40%)
+    # Substring match checked once per distinct application, then broadcast
+    app_values = match_arrays['app_values']
+    app_value_match = np.fromiter(
+        (user_app in value for value in app_values), dtype=bool, count=len(app_values)
+    )
+    app_score = app_value_match[match_arrays['app_codes']] * WEIGHT_APP
+
+    # Part B: Power Usage Match Score (40%)
+    # Exact match (True=1, False=0)
+    power_value_match = match_arrays['power_values'] == user_power
+    power_score = power_value_match[match_arrays['power_codes']] * WEIGHT_POWER
+
+    # Part C: Descriptive Similarity Score (20%)
+    desc_score = desc_similarity * WEIGHT_DESC
+
+    # Final Hybrid Score (guarantees a high score for perfect categorical matches)
+    hybrid_scores = app_score + power_score + desc_score
+
+    # 4. Rank Products, ensuring brand diversity
+    rows = diversify(hybrid_scores, match_arrays, top_n, brand_cap, brand_penalty)
+
+    # 5. Extract results (only the selected rows)
+    image_urls = match_arrays['image_urls']
+    return [{
+        'Product_Name': match_arrays['products'][i],
+        'Brand': match_arrays['brands'][i],
+        'Application': match_arrays['applications'][i].title(),
+        'PowerUsage': match_arrays['power_usages'][i].title(),
+        'Similarity_Score': round(float(hybrid_scores[i]) * 100, 2),
+        'Image_URL': image_urls[i] if image_urls is not None else ''
+    } for i in rows.tolist()]
+
+def get_recommendations(user_application, user_power_usage, user_description, dataframe, tfidf_vectorizer, tfidf_matrix, top_n=RECOMMENDATION_COUNT, output_json=False, match_arrays=None, brand_cap=BRAND_CAP, brand_penalty=BRAND_PENALTY):
     """
     Generates product recommendations using a weighted Hybrid Scoring Model.
     """
+    if match_arrays is None:
+        match_arrays = build_match_arrays(dataframe)
+
     # 1. Prepare User Inputs (lowercase for comparison)
     user_app = user_application.lower()
     user_power = user_power_usage.lower()
@@ -217,69 +456,16 @@ def get_recommendations(user_application, user_power_usage, user_description, da
 
     # 2. Calculate Description Similarity Score (20% Weight)
     # Transform user description using the trained descriptive vectorizer
+    # (rows and query are L2-normalized, so cosine similarity is a plain dot product)
     user_desc_vec = tfidf_vectorizer.transform([user_desc])
-    desc_similarity = cosine_similarity(user_desc_vec, tfidf_matrix).flatten()
-
-    # 3. Calculate Categorical Match Score (80% Weight)
-
-    # Initialize a list to hold the final scores
-    hybrid_scores = []
-
-    for i in range(len(dataframe)):
-        product = dataframe.iloc[i]
-
-        # Part A: Application Match Score (40%)
-        # Exact match (True=1, False=0)
-        app_match = 1.0 if user_app in product['Application'] else 0.0
-        app_score = app_match * WEIGHT_APP
-
-        # Part B: Power Usage Match Score (40%)
-        # Exact match (True=1, False=0)
-        power_match = 1.0 if user_power == product['PowerUsage'] else 0.0
-        power_score = power_match * WEIGHT_POWER
-
-        # Part C: Descriptive Similarity Score (20%)
-        desc_score = desc_similarity[i] * WEIGHT_DESC
-
-        # Final Hybrid Score (guarantees a high score for perfect categorical matches)
-        final_score = app_score + power_score + desc_score
-        hybrid_scores.append(final_score)
-
-    # 4. Rank Products
-    hybrid_scores_array = pd.Series(hybrid_scores)
-    top_indices = hybrid_scores_array.argsort()[::-1]
+    desc_similarity = row_scores(tfidf_matrix, user_desc_vec)
 
-    # 5. Extract results, ensuring brand diversity
-    recommended_products = []
-    seen_brands = set()
-
-    if not output_json:
-        print("\n--- Recommendation Results (Hybrid Scoring) ---")
-
-    for i in top_indices:
-        product = dataframe.iloc[i]
-        brand = product['Brand']
-
-        if brand not in seen_brands or len(recommended_products) < top_n:
-            recommended_products.append({
-                'Product_Name': product['Product'],
-                'Brand': brand,
-                'Application': product['Application'].title(),
-                'PowerUsage': product['PowerUsage'].title(),
-                'Similarity_Score': round(hybrid_scores[i] * 100, 2),
-                'Image_URL': product.get('Image_URL', '')
-            })
-            seen_brands.add(brand)
-
-            if len(recommended_products) >= top_n and len(seen_brands) >= top_n:
-                break
-
-        if len(recommended_products) >= top_n * 2:
-             break
+    recommended_products = rank_products(user_app, user_power, desc_similarity, match_arrays, top_n, brand_cap, brand_penalty)
 
     if output_json:
         return recommended_products
     else:
+        print("\n--- Recommendation Results (Hybrid Scoring) ---")
         for rank, rec in enumerate(recommended_products, 1):
             print(f"\nRANK {rank}: **{rec['Product_Name']}** (Brand: {rec['Brand']})")
             print(f"  > Match Score: {rec['Similarity_Score']}%")
@@ -288,7 +474,156 @@ def get_recommendations(user_application, user_power_usage, user_description, da
         print("-------------------------------------------\n")
         return recommended_products
 
-# --- 6. CLI ARGUMENT PARSER ---
+def get_batch_recommendations(queries, dataframe, tfidf_vectorizer, tfidf_matrix, match_arrays=None):
+    """
+    Answer many queries with one TF-IDF transform and one sparse similarity product.
+
+    Each query is a dict with application, power, description and optional
+    count, brand_cap and brand_penalty; returns one recommendation list per
+    query, in order.
+    """
+    if match_arrays is None:
+        match_arrays = build_match_arrays(dataframe)
+    if not queries:
+        return []
+
+    user_descs = [str(query.get('description', '')).lower() for query in queries]
+    # (queries x catalog) similarities, kept sparse until each row is scored
+    desc_similarities = score_matrix(tfidf_vectorizer.transform(user_descs), tfidf_matrix)
+
+    results = []
+    for i, query in enumerate(queries):
+        results.append(rank_products(
+            str(query.get('application', '')).lower(),
+            str(query.get('power', '')).lower(),
+            desc_similarities[i].toarray().ravel(),
+            match_arrays,
+            int(query.get('count', RECOMMENDATION_COUNT)),
+            int(query.get('brand_cap', BRAND_CAP)),
+            float(query.get('brand_penalty', BRAND_PENALTY))
+        ))
+    return results
+
+def load_queries(source):
+    """Read batch queries from a file path ('-' for stdin) as a JSON array or NDJSON"""
+    if source == '-':
+        text = sys.stdin.read()
+    else:
+        with open(source) as f:
+            text = f.read()
+    text = text.strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+# --- 6. PERSISTENT WORKER MODE ---
+def build_model(dataframe, copy=True):
+    """Preprocess a raw catalog and train the TF-IDF model on it"""
+    df = preprocess_data(dataframe, copy=copy)
+    tfidf_desc, tfidf_matrix_desc = train_model(df)
+    stored = compact(tfidf_matrix_desc, TFIDF_PRECISION)
+    if TFIDF_PRECISION != 'float64':
+        # Accuracy check of the reduced precision: catalog rows as sample queries
+        sample = tfidf_matrix_desc[::max(1, tfidf_matrix_desc.shape[0] // 64)]
+        debug_print(
+            f"DEBUG: {TFIDF_PRECISION} TF-IDF rows: {matrix_nbytes(stored)} bytes "
+            f"(float64 {matrix_nbytes(tfidf_matrix_desc)}), top-10 recall {ranking_recall(tfidf_matrix_desc, stored, sample):.3f}"
+        )
+    return df, tfidf_desc, stored, build_match_arrays(df)
+
+def save_model_artifacts(artifact_dir, model, version):
+    """Persist a trained model so the next worker can start without retraining"""
+    df, tfidf_desc, tfidf_matrix_desc, _ = model
+    columns = [col for col in ARTIFACT_COLUMNS if col in df.columns]
+    save_model(
+        artifact_dir,
+        ARTIFACT_ENGINE,
+        tfidf_desc,
+        tfidf_matrix_desc,
+        df[columns].to_dict(orient='records'),
+        version,
+        {'columns': columns}
+    )
+
+def load_model_artifacts(artifact_dir):
+    """Load a persisted model, returning (model, version) or (None, None)"""
+    loaded = load_model(artifact_dir, ARTIFACT_ENGINE)
+    if loaded is None:
+        return None, None
+    tfidf_desc, tfidf_matrix_desc, products, meta = loaded
+    if stored_precision(tfidf_matrix_desc) != TFIDF_PRECISION:
+        tfidf_matrix_desc = compact(tfidf_matrix_desc, TFIDF_PRECISION)
+    df = pd.DataFrame(products, columns=meta['columns'])
+    return (df, tfidf_desc, tfidf_matrix_desc, build_match_arrays(df)), meta['version']
+
+def handle_message(message, state):
+    """Reply to one worker message: a "products" catalog (retrained if new), a "queries" batch or a single query"""
+    if 'products' in message:
+        version = catalog_fingerprint(message['products'])
+        if state.get('model') is None or version != state.get('version'):
+            state['model'] = build_model(pd.DataFrame(message['products']))
+            state['version'] = version
+            if state.get('artifact_dir'):
+                try:
+                    save_model_artifacts(state['artifact_dir'], state['model'], version)
+                except Exception as e:
+                    debug_print(f"ERROR: Could not persist model artifacts: {e}")
+        return {'success': True, 'loaded': len(state['model'][0]), 'version': version}
+
+    if state.get('model') is None:
+        return {'success': False, 'message': 'Products not loaded'}
+
+    df, tfidf_desc, tfidf_matrix_desc, match_arrays = state['model']
+    if 'queries' in message:
+        batch = get_batch_recommendations(message['queries'], df, tfidf_desc, tfidf_matrix_desc, match_arrays)
+        return {'success': True, 'data': batch}
+
+    recommendations = get_recommendations(
+        str(message.get('application', '')),
+        str(message.get('power', '')),
+        str(message.get('description', '')),
+        df,
+        tfidf_desc,
+        tfidf_matrix_desc,
+        top_n=int(message.get('count', RECOMMENDATION_COUNT)),
+        output_json=True,
+        match_arrays=match_arrays,
+        brand_cap=int(message.get('brand_cap', BRAND_CAP)),
+        brand_penalty=float(message.get('brand_penalty', BRAND_PENALTY))
+    )
+    return {'success': True, 'data': recommendations}
+
+def serve(state, input_stream=None, output_stream=None):
+    """
+    Run as a long-lived worker reading newline-delimited JSON from stdin.
+
+    Every input line gets exactly one JSON line back on stdout, so the caller
+    can pair requests and replies in order (an optional "id" is echoed back).
+    The model is only rebuilt when a message carries a new catalog.
+    """
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+
+    debug_print("DEBUG: Recommendation worker ready")
+    for line in input_stream:
+        line = line.strip()
+        if not line:
+            continue
+
+        message = {}
+        try:
+            message = loads_json(line)
+            reply = handle_message(message, state)
+        except Exception as e:
+            debug_print(f"ERROR: Worker failed to handle message: {e}")
+            reply = {'success': False, 'message': str(e)}
+
+        if isinstance(message, dict) and 'id' in message:
+            reply['id'] = message['id']
+        output_stream.write(dumps_json(reply).decode('utf-8') + '\n')
+        output_stream.flush()
+
+# --- 7. CLI ARGUMENT PARSER ---
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Product Recommendation System')
     parser.add_argument('--application', type=str, help='Application type (e.g., Packaging, Woodworking)')
@@ -296,17 +631,39 @@ if __name__ == "__main__":
     parser.add_argument('--description', type=str, help='Product description requirements')
     parser.add_argument('--json', action='store_true', help='Output results as JSON')
     parser.add_argument('--count', type=int, default=RECOMMENDATION_COUNT, help='Number of recommendations')
+    parser.add_argument('--brand-cap', type=int, default=BRAND_CAP, help='Most recommendations per brand (0: top N plus the best of other brands)')
+    parser.add_argument('--brand-penalty', type=float, default=BRAND_PENALTY, help='Score penalty per product of the same brand already recommended')
     parser.add_argument('--data-json', type=str, help='Product data as JSON string')
     parser.add_argument('--data-stdin', action='store_true', help='Read product data from stdin')
     parser.add_argument('--data-csv', type=str, help='Path to CSV file (default: use DATA_FILE constant)')
+    parser.add_argument('--serve', action='store_true', help='Run as a persistent worker answering NDJSON queries on stdin')
+    parser.add_argument('--batch', type=str, help="File of queries (JSON array or NDJSON, '-' for stdin) answered in one pass")
+    parser.add_argument('--artifacts', type=str, default=MODEL_ARTIFACT_DIR, help='Directory to load/persist the trained model in --serve mode')
 
     args = parser.parse_args()
 
+    if args.serve:
+        # Catalog arrives as a {"products": [...]} message unless given up front
+        # or left behind in the artifact directory by a previous worker
+        state = {'model': None, 'version': None, 'artifact_dir': args.artifacts}
+        if args.data_json:
+            state['model'] = build_model(load_data_from_json(args.data_json))
+        elif args.data_csv:
+            state['model'] = build_model(load_data_from_csv(args.data_csv))
+        elif args.artifacts:
+            try:
+                state['model'], state['version'] = load_model_artifacts(args.artifacts)
+            except Exception as e:
+                debug_print(f"ERROR: Could not load model artifacts: {e}")
+        serve(state)
+        sys.exit(0)
+
     # Load product data
+    owned_frame = False
     if args.data_stdin:
-        # Read from stdin
-        json_data = sys.stdin.read()
-        df = load_data_from_json(json_data)
+        # Stream from stdin (JSON array or NDJSON), keeping only the model's columns
+        df = load_data_from_stream(sys.stdin)
+        owned_frame = True
     elif args.data_json:
         # Load from JSON argument
         df = load_data_from_json(args.data_json)
@@ -318,8 +675,16 @@ if __name__ == "__main__":
         df = load_data_from_csv(DATA_FILE)
 
     # Preprocess data and train model
-    df = preprocess_data(df)
-    tfidf_desc, tfidf_matrix_desc = train_model(df)
+    df, tfidf_desc, tfidf_matrix_desc, match_arrays = build_model(df, copy=not owned_frame)
+
+    # Batch mode: answer every query from the file in one matrix operation
+    if args.batch:
+        queries = load_queries(args.batch)
+        print(json.dumps({
+            'success': True,
+            'data': get_batch_recommendations(queries, df, tfidf_desc, tfidf_matrix_desc, match_arrays)
+        }, indent=2))
+        sys.exit(0)
 
     # If no search arguments provided, run interactive mode
     if not args.application or not args.power or not args.description:
@@ -338,7 +703,10 @@ if __name__ == "__main__":
             tfidf_desc,
             tfidf_matrix_desc,
             top_n=args.count,
-            output_json=False
+            output_json=False,
+            match_arrays=match_arrays,
+            brand_cap=args.brand_cap,
+            brand_penalty=args.brand_penalty
         )
     else:
         # CLI mode with arguments
@@ -350,7 +718,10 @@ if __name__ == "__main__":
             tfidf_desc,
             tfidf_matrix_desc,
             top_n=args.count,
-            output_json=args.json
+            output_json=args.json,
+            match_arrays=match_arrays,
+            brand_cap=args.brand_cap,
+            brand_penalty=args.brand_penalty
         )
 
         if args.json:
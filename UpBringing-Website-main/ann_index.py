@@ -0,0 +1,99 @@
+"""
+Approximate nearest-neighbour index over L2-normalized TF-IDF rows
+
+An inverted-file (IVF) index: the rows are clustered with spherical k-means
+into a few hundred lists, and a query is only scored against the rows of the
+lists whose centroids are closest to it. Probing more lists trades latency for
+recall; probing all of them is exact. Pure NumPy/SciPy, no extra dependency.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+def normalize_rows(matrix):
+    """Scale the rows of a dense matrix to unit L2 norm (zero rows stay zero)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class IVFIndex:
+    """
+    Inverted-file index: one centroid per list and the list id of every row.
+
+    Instances are never modified; take()/extend() return new indexes so a
+    published model snapshot can keep sharing its index with readers.
+    """
+    def __init__(self, centroids, row_lists):
+        self.centroids = centroids
+        self.row_lists = row_lists
+
+    @classmethod
+    def build(cls, matrix, n_lists=0, iterations=10, sample_size=20000, seed=0):
+        """
+        Cluster the rows of a CSR matrix with spherical k-means.
+
+        n_lists defaults to sqrt(rows). Centroids are trained on a random sample
+        of at most sample_size rows, then every row is assigned to its nearest one.
+        """
+        matrix = sp.csr_matrix(matrix)
+        n_rows = matrix.shape[0]
+        rng = np.random.default_rng(seed)
+        sample = matrix
+        if n_rows > sample_size:
+            sample = matrix[np.sort(rng.choice(n_rows, sample_size, replace=False))]
+
+        if n_lists <= 0:
+            n_lists = int(np.sqrt(n_rows))
+        n_lists = max(1, min(n_lists, sample.shape[0]))
+
+        seeds = rng.choice(sample.shape[0], n_lists, replace=False)
+        centroids = normalize_rows(sample[seeds].toarray().astype(np.float32))
+        for _ in range(iterations):
+            assignment = np.asarray((sample @ centroids.T).argmax(axis=1)).ravel()
+            members = sp.csr_matrix(
+                (np.ones(len(assignment), dtype=np.float32), (assignment, np.arange(len(assignment)))),
+                shape=(n_lists, sample.shape[0])
+            )
+            sums = np.asarray((members @ sample).todense(), dtype=np.float32)
+            # Empty lists keep their previous centroid
+            empty = np.asarray(members.sum(axis=1)).ravel() == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+
+        index = cls(centroids, np.empty(0, dtype=np.int32))
+        return index.extend(matrix)
+
+    def assign(self, matrix):
+        """List id of the nearest centroid for each row of matrix"""
+        if matrix.shape[0] == 0:
+            return np.empty(0, dtype=np.int32)
+        return np.asarray((matrix @ self.centroids.T).argmax(axis=1)).ravel().astype(np.int32)
+
+    def take(self, rows):
+        """Index over only the given rows, in order (centroids are shared)"""
+        return IVFIndex(self.centroids, self.row_lists[rows])
+
+    def extend(self, matrix):
+        """Index with the rows of matrix appended, assigned to the existing lists"""
+        return IVFIndex(self.centroids, np.concatenate([self.row_lists, self.assign(matrix)]))
+
+    def __len__(self):
+        return len(self.centroids)
+
+    def search(self, query_vector, rows, count, nprobe):
+        """
+        The subset of candidate rows (ascending catalog row ids) worth scoring.
+
+        Keeps the candidates in the nprobe lists closest to the query, widened
+        list by list until at least `count` candidates remain, so a narrow
+        filter never returns fewer results than the exact search would.
+        """
+        centroid_scores = np.asarray(query_vector @ self.centroids.T).ravel()
+        list_rank = np.empty(len(self.centroids), dtype=np.int32)
+        list_rank[np.argsort(-centroid_scores, kind='stable')] = np.arange(len(self.centroids))
+
+        candidate_rank = list_rank[self.row_lists[rows]]
+        threshold = nprobe - 1
+        if count > 0 and len(rows) > 0:
+            needed = min(count, len(rows)) - 1
+            threshold = max(threshold, np.partition(candidate_rank, needed)[needed])
+        return rows[candidate_rank <= threshold]
@@ -0,0 +1,357 @@
+"""
+Benchmark harness for both recommendation engines
+
+Generates a synthetic Zoho-shaped catalog and measures, per engine:
+  python_server - preprocess_products (load + fit) and get_recommendations
+  aitools2      - preprocess_data, train_model and get_recommendations
+  http          - /api/load-products and /api/recommendations on a live uvicorn server
+load/fit time, per-query p50/p95/p99 latency, throughput under concurrency and
+peak RSS. Each engine runs in its own child process so peak RSS is its own.
+
+Usage:
+  python3 benchmark.py --products 20000 --output run.json
+  python3 benchmark.py --products 20000 --compare run.json   # exit 1 on regressions
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ENGINES = ('python_server', 'aitools2', 'http')
+BASE_APPLICATIONS = [
+    'Packaging', 'Woodworking', 'Food Processing', 'Pharmaceutical', 'CNC Routers', 'Printing',
+    'Plastics', 'Electronics', 'Medical', 'Laboratory', 'Bottling', 'Textile', 'Paper Handling',
+    'Degassing', 'Drying', 'Pick and Place', 'Thermoforming', 'Vacuum Lifting', 'Composites', 'Semiconductors',
+]
+DESCRIPTION_WORDS = (
+    'oil free rotary vane claw screw dry liquid ring side channel blower compressor pump vacuum '
+    'quiet compact robust efficient low maintenance high flow continuous duty corrosion resistant '
+    'air cooled water cooled variable speed drive stainless steel cast iron explosion proof '
+    'single stage two stage ultimate pressure suction capacity noise level energy saving'
+).split()
+BRANDS = ['Becker', 'Busch', 'Atlas Copco', 'Gardner', 'Elmo Rietschle', 'Pfeiffer', 'Leybold', 'Edwards', 'Fipa', 'Schmalz']
+# How "Motor Rating (kw)" values are written in the source data
+RATING_FORMATS = ('plain', 'range', 'unit', 'blank', 'number')
+RATINGS_KW = [0.37, 0.55, 0.75, 1.1, 1.5, 2.2, 3, 4, 5.5, 7.5, 11, 15, 18.5, 22]
+
+def application_vocabulary(size):
+    """size application names: the real ones first, then synthetic ones"""
+    names = BASE_APPLICATIONS[:size]
+    names += [f'Application {i}' for i in range(len(names), size)]
+    return names
+
+def motor_rating(rng, rating_format):
+    rating = rng.choice(RATINGS_KW)
+    if rating_format == 'range':
+        return f'{rating}/{rng.choice(RATINGS_KW)}'
+    if rating_format == 'unit':
+        return f'{rating} kW'
+    if rating_format == 'blank':
+        return ''
+    if rating_format == 'number':
+        return rating
+    return str(rating)
+
+def generate_catalog(count, applications=12, rating_formats=RATING_FORMATS, seed=0):
+    """Product records shaped like zohoProductService.fetchAndMergeProducts() output"""
+    rng = random.Random(seed)
+    vocabulary = application_vocabulary(applications)
+    products = []
+    for i in range(count):
+        products.append({
+            'Product_ID': f'PD{i:06d}',
+            'Brand': rng.choice(BRANDS),
+            'Product': f'{rng.choice("ABCDEFGHKLMPRSTVX")}{rng.choice("ABCDEFGHKLMPRSTVX")} {rng.randint(4, 999)}',
+            'Type': rng.choice(['Vacuum Pump', 'Blower', 'Compressor']),
+            'Subtype': rng.choice(['Rotary Vane', 'Claw', 'Screw', 'Side Channel', 'Liquid Ring']),
+            'Series': f'{rng.choice("ABCDEFG")} SERIES',
+            'Product_Details': ' '.join(rng.sample(DESCRIPTION_WORDS, rng.randint(6, 16))),
+            'Application': ', '.join(rng.sample(vocabulary, rng.randint(1, min(3, len(vocabulary))))),
+            'Image_URL': f'https://example.com/images/{i}.png',
+            'm3/h': str(rng.randint(4, 2000)),
+            'Hz': rng.choice(['50', '60', '50/60']),
+            'Vacuum(mbar)': str(rng.choice([0.5, 2, 10, 50, 150])),
+            'Pressure(mbar)': '',
+            'Motor Rating (kw)': motor_rating(rng, rng.choice(rating_formats)),
+            'RPM': str(rng.choice([1450, 1750, 2900, 3500])),
+            'Oil_ltr': '',
+        })
+    return products
+
+def generate_queries(count, applications=12, seed=1):
+    """(application, power, description) queries over the catalog's vocabulary"""
+    rng = random.Random(seed)
+    vocabulary = application_vocabulary(applications)
+    return [
+        (rng.choice(vocabulary), rng.choice(['High', 'Medium', 'Low']), ' '.join(rng.sample(DESCRIPTION_WORDS, rng.randint(1, 4))))
+        for _ in range(count)
+    ]
+
+def latency_stats(samples):
+    """p50/p95/p99/mean/max of per-call seconds, in milliseconds"""
+    ms = np.asarray(samples) * 1000.0
+    return {
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'mean_ms': float(ms.mean()),
+        'max_ms': float(ms.max()),
+    }
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+def measure_queries(run_query, queries, concurrency):
+    """Sequential latency percentiles, then throughput with `concurrency` threads"""
+    latencies = [timed(run_query, query)[1] for query in queries]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run_query, queries))
+    elapsed = time.perf_counter() - started
+    return {
+        'latency': latency_stats(latencies),
+        'throughput_qps': len(queries) / elapsed,
+        'concurrency': concurrency,
+    }
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def bench_python_server(catalog, queries, args):
+    # Start cold: no shared artifacts or background sync from the environment, and the
+    # imports done up front so they do not count towards the fit
+    os.environ.update(MODEL_ARTIFACT_DIR='', CATALOG_SOURCE='')
+    import python_server
+    python_server.ensure_scientific_stack()
+
+    _, fit_seconds = timed(python_server.preprocess_products, catalog)
+
+    def run_query(query):
+        return python_server.get_recommendations(*query, count=args.count)
+
+    return {
+        'fit_s': fit_seconds,
+        **measure_queries(run_query, queries, args.concurrency),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def bench_aitools2(catalog, queries, args):
+    import pandas as pd
+    import aitools2
+
+    frame = pd.DataFrame(catalog)
+    df, preprocess_seconds = timed(aitools2.preprocess_data, frame)
+    (vectorizer, matrix), train_seconds = timed(aitools2.train_model, df)
+    match_arrays = aitools2.build_match_arrays(df)
+
+    def run_query(query):
+        return aitools2.get_recommendations(
+            *query, df, vectorizer, matrix, top_n=args.count, output_json=True, match_arrays=match_arrays
+        )
+
+    return {
+        'preprocess_s': preprocess_seconds,
+        'train_s': train_seconds,
+        'fit_s': preprocess_seconds + train_seconds,
+        **measure_queries(run_query, queries, args.concurrency),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def post_json(url, payload, timeout=600):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode('utf-8'), headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.load(response)
+
+def server_peak_rss_mb(pid):
+    """VmHWM of a running process from /proc (None where /proc is unavailable)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def bench_http(catalog, queries, args):
+    """End to end through uvicorn on args.port (result cache off, so every query computes)"""
+    base_url = f'http://127.0.0.1:{args.port}'
+    env = dict(os.environ, RESULT_CACHE_SIZE='0', MODEL_ARTIFACT_DIR='', CATALOG_SOURCE='', FAST_START='0')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'python_server:app', '--host', '127.0.0.1',
+         '--port', str(args.port), '--log-level', 'warning'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.time() + 120
+        while True:
+            try:
+                with urllib.request.urlopen(f'{base_url}/api/health', timeout=2):
+                    break
+            except OSError:
+                if time.time() > deadline or server.poll() is not None:
+                    raise RuntimeError('python_server did not start')
+                time.sleep(0.2)
+
+        _, load_seconds = timed(post_json, f'{base_url}/api/load-products', catalog)
+
+        def run_query(query):
+            application, power, description = query
+            return post_json(f'{base_url}/api/recommendations', {
+                'application': application, 'power': power, 'description': description, 'count': args.count
+            })
+
+        return {
+            'load_s': load_seconds,
+            **measure_queries(run_query, queries, args.concurrency),
+            'peak_rss_mb': server_peak_rss_mb(server.pid),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+BENCHMARKS = {'python_server': bench_python_server, 'aitools2': bench_aitools2, 'http': bench_http}
+
+def run_engine(engine, args):
+    """Run one engine's benchmark in this process"""
+    catalog = generate_catalog(args.products, args.applications, args.rating_formats, args.seed)
+    queries = generate_queries(args.queries, args.applications, args.seed + 1)
+    return BENCHMARKS[engine](catalog, queries, args)
+
+def run_engine_in_child(engine, argv):
+    """Run one engine in a fresh interpreter and return its JSON result"""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *argv, '--engine', engine, '--child'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    )
+    return json.loads(completed.stdout.decode('utf-8').strip().splitlines()[-1])
+
+# Metrics where larger is better; everything else numeric is a cost
+HIGHER_IS_BETTER = ('throughput_qps',)
+
+def flatten(results, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1}, numeric leaves only"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key != 'concurrency':
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+def compare(baseline, current, threshold):
+    """Print metric changes vs a baseline run; returns the regressed metric names"""
+    old, new = flatten(baseline['results']), flatten(current['results'])
+    regressions = []
+    for name in sorted(old.keys() & new.keys()):
+        if not old[name]:
+            continue
+        change = (new[name] - old[name]) / old[name]
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        flag = ''
+        if worse > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f'{name:45s} {old[name]:12.3f} -> {new[name]:12.3f} ({change:+.1%}){flag}', file=sys.stderr)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the recommendation engines')
+    parser.add_argument('--products', type=int, default=5000, help='Synthetic catalog size')
+    parser.add_argument('--applications', type=int, default=12, help='Distinct application values')
+    parser.add_argument('--rating-formats', type=lambda value: tuple(value.split(',')), default=RATING_FORMATS,
+                        help=f"Comma-separated motor rating formats to mix ({','.join(RATING_FORMATS)})")
+    parser.add_argument('--queries', type=int, default=200, help='Queries per engine')
+    parser.add_argument('--count', type=int, default=10, help='Recommendations per query')
+    parser.add_argument('--concurrency', type=int, default=8, help='Threads for the throughput run')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for catalog and queries')
+    parser.add_argument('--engines', type=lambda value: value.split(','), default=list(ENGINES),
+                        help=f"Comma-separated engines to run ({','.join(ENGINES)})")
+    parser.add_argument('--port', type=int, default=8765, help='Port for the http engine')
+    parser.add_argument('--output', type=str, help='Write the JSON results here (default: stdout)')
+    parser.add_argument('--compare', type=str, help='Baseline JSON to compare against; exit 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Relative change counted as a regression')
+    parser.add_argument('--engine', choices=ENGINES, help=argparse.SUPPRESS)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_engine(args.engine, args)))
+        return 0
+
+    unknown = set(args.engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(sorted(unknown))}")
+    unknown = set(args.rating_formats) - set(RATING_FORMATS)
+    if unknown:
+        parser.error(f"unknown rating formats: {', '.join(sorted(unknown))}")
+
+    child_argv = [
+        '--products', str(args.products), '--applications', str(args.applications),
+        '--rating-formats', ','.join(args.rating_formats), '--queries', str(args.queries),
+        '--count', str(args.count), '--concurrency', str(args.concurrency),
+        '--seed', str(args.seed), '--port', str(args.port),
+    ]
+    results = {}
+    for engine in args.engines:
+        print(f'⏱️  Benchmarking {engine} ({args.products} products, {args.queries} queries)...', file=sys.stderr)
+        results[engine] = run_engine_in_child(engine, child_argv)
+
+    report = {
+        'config': {
+            'products': args.products,
+            'applications': args.applications,
+            'rating_formats': list(args.rating_formats),
+            'queries': args.queries,
+            'count': args.count,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+        },
+        'timestamp': time.time(),
+        'results': results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+            return 1
+        print('✅ No regressions', file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
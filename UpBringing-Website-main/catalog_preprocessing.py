@@ -0,0 +1,63 @@
+"""
+Vectorized catalog preprocessing shared by python_server.py and aitools2.py
+
+Replaces per-row .apply() calls with column-wise pandas/NumPy operations.
+Motor ratings repeat heavily across a catalog, so they are factorized and only
+the distinct values are classified; text columns are cleaned with .str ops.
+"""
+import numpy as np
+import pandas as pd
+
+# Motor rating thresholds (kW) for the PowerUsage buckets
+HIGH_POWER_KW = 5.5
+MEDIUM_POWER_KW = 2.0
+
+def determine_power_usage(motor_rating):
+    """Classify power usage based on motor rating"""
+    try:
+        rating = float(str(motor_rating).split('/')[0].strip())
+    except Exception:
+        return 'medium'
+
+    if rating >= HIGH_POWER_KW:
+        return 'high'
+    elif rating >= MEDIUM_POWER_KW:
+        return 'medium'
+    else:
+        return 'low'
+
+def classify_power_usage(ratings):
+    """
+    Classify a Series of motor ratings (kW) into 'high', 'medium' or 'low'.
+
+    Same result as determine_power_usage per value (ratings like "5.5/7.5" use
+    the first value, unparseable ones are 'medium', NaN is 'low'), but the
+    function runs once per distinct rating instead of once per product.
+    """
+    try:
+        codes, uniques = pd.factorize(ratings)
+    except TypeError:
+        # Unhashable values (e.g. lists from raw JSON) - classify one by one
+        return pd.Series(
+            [determine_power_usage(value) for value in ratings.to_numpy(dtype=object)],
+            index=ratings.index, dtype=object
+        )
+
+    buckets = np.array([determine_power_usage(value) for value in uniques] + [None], dtype=object)
+    result = buckets[codes]
+
+    # factorize folds NaN/None/NA into one sentinel, but str() tells them
+    # apart ("nan" parses, "None" does not), so resolve those rows directly
+    missing = codes < 0
+    if missing.any():
+        values = ratings.to_numpy(dtype=object)[missing]
+        result[missing] = [determine_power_usage(value) for value in values]
+
+    return pd.Series(result, index=ratings.index, dtype=object)
+
+def clean_text(series, default='', lower=False):
+    """Missing values become default, everything else str (optionally lowercased)"""
+    cleaned = series.fillna(default).astype(str)
+    if lower:
+        cleaned = cleaned.str.lower()
+    return cleaned
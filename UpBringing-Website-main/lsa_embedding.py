@@ -0,0 +1,65 @@
+"""
+Dense LSA embeddings of TF-IDF rows
+
+TruncatedSVD projects the sparse TF-IDF matrix onto a few dozen latent
+dimensions, fit locally on the catalog. Terms that co-occur across products
+land close together, so a query can match products that use a synonym of its
+words. Embeddings are stored as one C-contiguous float32 array with unit rows,
+so scoring a query is a single BLAS matrix-vector product.
+"""
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+
+def unit_rows(matrix):
+    """float32 C-contiguous copy of matrix with unit L2 rows (zero rows stay zero)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms)
+
+class LSAEmbedding:
+    """
+    SVD components (dimensions x terms) and the embedding of every catalog row.
+
+    Like IVFIndex, instances are never modified; take()/extend() return new
+    embeddings that share the components.
+    """
+    def __init__(self, components, vectors):
+        self.components = components
+        self.vectors = vectors
+
+    @classmethod
+    def fit(cls, matrix, n_components, seed=0):
+        """Fit on a TF-IDF matrix; None if the catalog is too small for n_components"""
+        n_components = min(n_components, matrix.shape[0] - 1, matrix.shape[1] - 1)
+        if n_components < 1:
+            return None
+        svd = TruncatedSVD(n_components=n_components, algorithm='randomized', random_state=seed)
+        vectors = svd.fit_transform(matrix)
+        return cls(np.ascontiguousarray(svd.components_, dtype=np.float32), unit_rows(vectors))
+
+    @property
+    def dimensions(self):
+        return self.components.shape[0]
+
+    def project(self, matrix):
+        """Embed TF-IDF rows (catalog rows or queries) with the fitted components"""
+        if matrix.shape[0] == 0:
+            return np.empty((0, self.dimensions), dtype=np.float32)
+        return unit_rows(matrix @ self.components.T)
+
+    def take(self, rows):
+        """Embedding of only the given rows, in order"""
+        return LSAEmbedding(self.components, np.ascontiguousarray(self.vectors[rows]))
+
+    def extend(self, matrix):
+        """Embedding with the TF-IDF rows of matrix appended"""
+        return LSAEmbedding(self.components, np.concatenate([self.vectors, self.project(matrix)]))
+
+    def similarities(self, query_vector, rows):
+        """Cosine similarity of one TF-IDF query to the given catalog rows"""
+        query = self.project(query_vector)[0]
+        if len(rows) * 2 > len(self.vectors):
+            # Most of the catalog: one matvec over the contiguous array beats a gather
+            return (self.vectors @ query)[rows]
+        return self.vectors[rows] @ query
@@ -0,0 +1,131 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format
+
+Counters and fixed-bucket histograms keyed by name and labels, plus a
+stage timer for the recommendation hot path. No client library needed; each
+server process reports its own values (scrape every worker, or sum them).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram buckets in seconds, from sub-millisecond stages to full reloads
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values"""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms with HELP text, rendered on demand"""
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.help = {}
+        self.buckets = {}
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def describe(self, name, text, buckets=None):
+        """HELP text of a metric, and histogram buckets if not DEFAULT_BUCKETS"""
+        self.help[name] = text
+        if buckets is not None:
+            self.buckets[name] = tuple(buckets)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets.get(name, DEFAULT_BUCKETS))
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the wall time of the with-block (in seconds)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def render(self, collected=()):
+        """
+        Prometheus text format of every metric.
+
+        collected is an iterable of (name, type, help, [(labels dict, value), ...])
+        read at scrape time, for values owned elsewhere (catalog size, cache stats).
+        """
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, (list(h.buckets), list(h.counts), h.sum, h.count))
+                for key, h in self.histograms.items()
+            )
+
+        def header(name, kind):
+            full = self.prefix + name
+            if name in self.help:
+                lines.append(f'# HELP {full} {self.help[name]}')
+            lines.append(f'# TYPE {full} {kind}')
+            return full
+
+        previous = None
+        for (name, labels), value in counters:
+            if name != previous:
+                full = header(name, 'counter')
+                previous = name
+            lines.append(f'{full}{format_labels(labels)} {format_value(value)}')
+
+        previous = None
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            if name != previous:
+                full = header(name, 'histogram')
+                previous = name
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{full}_bucket{format_labels(labels + (("le", format_value(float(bound))),))} {cumulative}')
+            lines.append(f'{full}_bucket{format_labels(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{full}_sum{format_labels(labels)} {format_value(total)}')
+            lines.append(f'{full}_count{format_labels(labels)} {count}')
+
+        for name, kind, text, samples in collected:
+            self.help.setdefault(name, text)
+            full = header(name, kind)
+            for labels, value in samples:
+                lines.append(f'{full}{format_labels(tuple(sorted(labels.items())))} {format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
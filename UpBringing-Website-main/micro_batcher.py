@@ -0,0 +1,115 @@
+"""
+Adaptive micro-batching of concurrent requests
+
+Callers await submit(item); a dispatcher task on the event loop coalesces
+the items queued behind one another into a batch and hands it to a handler
+running on a worker thread, which answers the whole batch at once. A batch
+closes at max_batch_size items or max_wait after its first item arrived,
+whichever comes first. The window adapts to load: it is skipped while
+requests arrive one at a time (the previous batch held a single item), and
+time spent waiting for a free worker counts towards it, so under load full
+batches go out without any added delay.
+
+The queue is bounded: once max_queue items wait for a batch, submit() raises
+Overloaded instead of letting latency grow without limit.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class Overloaded(RuntimeError):
+    """The batch queue is full; the caller should retry later"""
+
+class MicroBatcher:
+    """
+    Runs handler(items) -> results (one per item, in order) on batches of items.
+
+    A result that is an Exception instance fails only its own caller; an
+    exception raised by the handler fails the whole batch.
+    """
+    def __init__(self, handler, max_batch_size=32, max_wait=0.002, max_queue=256, workers=1, name='micro-batch'):
+        self.handler = handler
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max(max_wait, 0.0)
+        self.max_queue = max_queue
+        self.workers = max(workers, 1)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self.loop = None
+        self.queue = None
+        self.slots = None
+        self.dispatcher = None
+        self.in_flight = 0
+        self.last_batch_size = 0
+        self.batches = 0
+        self.shed = 0
+
+    @property
+    def queued(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def bind(self, loop):
+        """(Re)create the queue and dispatcher on the running event loop"""
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.workers)
+        self.in_flight = 0
+        self.dispatcher = loop.create_task(self.dispatch())
+
+    async def submit(self, item):
+        """Queue item for the next batch and wait for its result"""
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop or self.dispatcher.done():
+            self.bind(loop)
+        if self.max_queue > 0 and self.queue.qsize() >= self.max_queue:
+            self.shed += 1
+            raise Overloaded(f"{self.queue.qsize()} requests already queued")
+        future = loop.create_future()
+        self.queue.put_nowait((time.monotonic(), item, future))
+        return await future
+
+    async def dispatch(self):
+        while True:
+            entry = await self.queue.get()
+            batch = [entry]
+            # Wait for a free worker first; requests keep queuing meanwhile
+            await self.slots.acquire()
+            remaining = entry[0] + self.max_wait - time.monotonic()
+            if remaining > 0 and self.last_batch_size > 1 and self.queue.qsize() + 1 < self.max_batch_size:
+                await asyncio.sleep(remaining)
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            # Callers that went away (client disconnects) are dropped from the batch
+            batch = [entry for entry in batch if not entry[2].done()]
+            if not batch:
+                self.slots.release()
+                continue
+            self.in_flight += 1
+            self.batches += 1
+            self.last_batch_size = len(batch)
+            work = self.loop.run_in_executor(self.executor, self.handler, [item for _, item, _ in batch])
+            work.add_done_callback(lambda done, batch=batch: self.resolve(batch, done))
+
+    def resolve(self, batch, done):
+        self.in_flight -= 1
+        self.slots.release()
+        error = done.exception()
+        results = done.result() if error is None else [error] * len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "batches": self.batches,
+            "shed": self.shed,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_queue": self.max_queue,
+        }
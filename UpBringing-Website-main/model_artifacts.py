@@ -0,0 +1,156 @@
+"""
+On-disk model artifacts shared by python_server.py and aitools2.py
+
+A fitted catalog is written as one versioned directory:
+  tfidf_data.npy / tfidf_indices.npy / tfidf_indptr.npy  - CSR arrays of the TF-IDF matrix
+  tfidf_scale.npy                                        - per-row scales of an int8-quantized matrix
+  vectorizer.json                                        - vocabulary, idf and vectorizer params
+  products.json                                          - compact metadata of the served fields
+  meta.json                                              - format, engine, shape, catalog version and extras
+  array_<name>.npy                                       - optional extra arrays (LSA embedding, ANN lists)
+and a CURRENT file naming the live version, replaced atomically on save.
+Each engine (python_server, aitools2) stamps its artifacts and only loads its own.
+The matrix arrays are loaded with np.load(mmap_mode='r'), so a fresh process
+serves without refitting and all processes share the same page cache.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from tfidf_precision import QuantizedRows
+from wire_format import dumps_json
+
+CURRENT_FILE = 'CURRENT'
+# Layout version of the files above; bump when it changes incompatibly
+ARTIFACT_FORMAT = 1
+MATRIX_ARRAYS = ('data', 'indices', 'indptr')
+# Vectorizer params that are JSON-serializable and needed to rebuild transform()
+VECTORIZER_PARAMS = ('lowercase', 'stop_words', 'token_pattern', 'ngram_range', 'max_features', 'norm', 'use_idf', 'smooth_idf', 'sublinear_tf')
+
+def catalog_fingerprint(products):
+    """Stable content hash of a catalog payload, used as its version"""
+    return hashlib.sha256(dumps_json(products, sort_keys=True)).hexdigest()[:16]
+
+def save_model(artifact_dir, engine, vectorizer, matrix, products, version, meta=None, arrays=None):
+    """Write an engine's fitted model (plus optional named arrays) under artifact_dir/<version> and make it current"""
+    version_dir = os.path.join(artifact_dir, version)
+    tmp_dir = version_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    if isinstance(matrix, QuantizedRows):
+        np.save(os.path.join(tmp_dir, 'tfidf_scale.npy'), matrix.scale)
+        matrix = matrix.codes
+    matrix = sp.csr_matrix(matrix)
+    for name in MATRIX_ARRAYS:
+        np.save(os.path.join(tmp_dir, f'tfidf_{name}.npy'), getattr(matrix, name))
+    arrays = arrays or {}
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f'array_{name}.npy'), array)
+
+    params = vectorizer.get_params()
+    with open(os.path.join(tmp_dir, 'vectorizer.json'), 'w') as f:
+        json.dump({
+            'params': {name: params[name] for name in VECTORIZER_PARAMS},
+            'vocabulary': {term: int(index) for term, index in vectorizer.vocabulary_.items()},
+            'idf': vectorizer.idf_.tolist(),
+        }, f)
+
+    with open(os.path.join(tmp_dir, 'products.json'), 'w') as f:
+        json.dump(products, f, default=str)
+
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({
+            'format': ARTIFACT_FORMAT,
+            'engine': engine,
+            'version': version,
+            'shape': list(matrix.shape),
+            **(meta or {}),
+            'arrays': sorted(arrays),
+        }, f)
+
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.replace(tmp_dir, version_dir)
+
+    # Flip the CURRENT pointer atomically, then drop superseded versions
+    # (processes still mapping them keep their pages until they reload)
+    pointer_tmp = os.path.join(artifact_dir, CURRENT_FILE + '.tmp')
+    with open(pointer_tmp, 'w') as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(artifact_dir, CURRENT_FILE))
+
+    for entry in os.listdir(artifact_dir):
+        path = os.path.join(artifact_dir, entry)
+        if entry != version and os.path.isdir(path) and not entry.endswith('.tmp'):
+            shutil.rmtree(path, ignore_errors=True)
+
+    return version_dir
+
+def current_version(artifact_dir):
+    """Version named by the CURRENT pointer, or None if nothing was saved"""
+    try:
+        with open(os.path.join(artifact_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def current_stamp(artifact_dir):
+    """(inode, mtime) of the CURRENT pointer, which changes on every flip; None if nothing was saved"""
+    try:
+        stat = os.stat(os.path.join(artifact_dir, CURRENT_FILE))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+def load_model(artifact_dir, engine):
+    """
+    Load the current model that engine saved in artifact_dir.
+
+    Returns (vectorizer, matrix, products, meta), or None if no model was saved.
+    Raises ValueError for artifacts of another engine or format.
+    The CSR arrays of the matrix (a QuantizedRows if it was saved quantized)
+    are read-only memory maps, as are the extra arrays, which meta['arrays']
+    maps by name.
+    """
+    version = current_version(artifact_dir)
+    if version is None:
+        return None
+    version_dir = os.path.join(artifact_dir, version)
+
+    with open(os.path.join(version_dir, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('format') != ARTIFACT_FORMAT or meta.get('engine') != engine:
+        raise ValueError(
+            f"Artifacts in {version_dir} are {meta.get('engine')} format {meta.get('format')}, "
+            f"expected {engine} format {ARTIFACT_FORMAT}"
+        )
+
+    arrays = [
+        np.load(os.path.join(version_dir, f'tfidf_{name}.npy'), mmap_mode='r')
+        for name in MATRIX_ARRAYS
+    ]
+    matrix = sp.csr_matrix(tuple(arrays), shape=tuple(meta['shape']), copy=False)
+    scale_path = os.path.join(version_dir, 'tfidf_scale.npy')
+    if os.path.exists(scale_path):
+        matrix = QuantizedRows(matrix, np.load(scale_path, mmap_mode='r'))
+    meta['arrays'] = {
+        name: np.load(os.path.join(version_dir, f'array_{name}.npy'), mmap_mode='r')
+        for name in meta.get('arrays', [])
+    }
+
+    with open(os.path.join(version_dir, 'vectorizer.json')) as f:
+        saved = json.load(f)
+    params = dict(saved['params'])
+    params['ngram_range'] = tuple(params['ngram_range'])
+    vectorizer = TfidfVectorizer(vocabulary=saved['vocabulary'], **params)
+    vectorizer.idf_ = np.asarray(saved['idf'], dtype=np.float64)
+
+    with open(os.path.join(version_dir, 'products.json')) as f:
+        products = json.load(f)
+
+    return vectorizer, matrix, products, meta
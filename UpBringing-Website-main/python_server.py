@@ -2,24 +2,103 @@
 Fast AI Recommendations Server
 Keeps TF-IDF vectors cached in memory for instant recommendations
 """
-# Verify imports work
-print("🔍 Importing FastAPI...", flush=True)
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-print("🔍 Importing Pydantic...", flush=True)
-from pydantic import BaseModel
-print("🔍 Importing Pandas...", flush=True)
-import pandas as pd
-print("🔍 Importing sklearn...", flush=True)
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-print("🔍 Importing uvicorn...", flush=True)
-import uvicorn
+import asyncio
+import fcntl
 import os
-from typing import List, Dict, Any
-print("✅ All imports successful!", flush=True)
+import re
+import time
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager, suppress
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional
 
-app = FastAPI()
+# Seconds spent per startup stage (imports, model load), reported by /api/health
+startup_started = time.perf_counter()
+startup_timings = {}
+
+@contextmanager
+def startup_stage(name, message=None):
+    """Time a startup stage into startup_timings, announcing it if given a message"""
+    if message:
+        print(message, flush=True)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = round(time.perf_counter() - started, 4)
+
+# Verify imports work (only what it takes to bind and answer /api/health;
+# pandas/sklearn/scipy are imported by import_scientific_stack())
+with startup_stage('fastapi', "🔍 Importing FastAPI..."):
+    from fastapi import FastAPI, HTTPException, Request, Response
+    from fastapi.responses import PlainTextResponse
+    from fastapi.middleware.cors import CORSMiddleware
+with startup_stage('pydantic', "🔍 Importing Pydantic..."):
+    from pydantic import BaseModel
+with startup_stage('numpy', "🔍 Importing NumPy..."):
+    import numpy as np
+from metrics import MetricsRegistry
+from micro_batcher import MicroBatcher, Overloaded
+from sampling_profiler import SamplingProfiler
+from wire_format import UnsupportedMediaType, decode_catalog, encode, loads_json, response_media_type
+print("✅ Server imports successful!", flush=True)
+
+def import_scientific_stack():
+    """
+    Import pandas, sklearn and the modules built on them (timed per stage).
+
+    Their names become module globals as if imported at the top; nothing
+    touching them may run before this (see ensure_scientific_stack()).
+    """
+    global pd, TfidfVectorizer, IVFIndex, classify_power_usage, clean_text, LSAEmbedding
+    global catalog_fingerprint, save_model, load_model, current_stamp, current_version
+    global as_float, compact, matrix_nbytes, pair_scores, ranking_recall, row_scores, score_matrix, stored_precision, vstack_rows
+
+    with startup_stage('pandas', "🔍 Importing Pandas..."):
+        import pandas as pd
+    with startup_stage('sklearn', "🔍 Importing sklearn..."):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+    with startup_stage('model_modules'):
+        from ann_index import IVFIndex
+        from catalog_preprocessing import classify_power_usage, clean_text
+        from lsa_embedding import LSAEmbedding
+        from model_artifacts import catalog_fingerprint, save_model, load_model, current_stamp, current_version
+        from tfidf_precision import as_float, compact, matrix_nbytes, pair_scores, ranking_recall, row_scores, score_matrix, stored_precision, vstack_rows
+    print("✅ All imports successful!", flush=True)
+
+scientific_stack_lock = threading.Lock()
+scientific_stack_ready = False
+
+def ensure_scientific_stack():
+    """Import the scientific stack once; other callers block until it is in place"""
+    global scientific_stack_ready
+
+    if scientific_stack_ready:
+        return
+    with scientific_stack_lock:
+        if not scientific_stack_ready:
+            import_scientific_stack()
+            scientific_stack_ready = True
+
+@asynccontextmanager
+async def lifespan(app):
+    """Warm up the process serving app, then run the background catalog sync (if configured)"""
+    # Here rather than at import: neither the uvicorn supervisor nor the worker's
+    # __mp_main__ copy of this module serves requests, so neither should load a model
+    warming = start_warm_up()
+    if not FAST_START:
+        await asyncio.wrap_future(warming)
+    sync_task = asyncio.create_task(run_catalog_sync()) if CATALOG_SOURCE else None
+    yield
+    if sync_task is not None:
+        sync_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await sync_task
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -30,19 +109,381 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global cache for products and TF-IDF vectors
-products_df = None
-tfidf_vectorizer = None
-tfidf_matrix = None
+@app.middleware("http")
+async def catalog_version_header(request, call_next):
+    """Tag every response with the catalog version being served"""
+    response = await call_next(request)
+    snapshot = model_snapshot
+    if snapshot is not None and snapshot.catalog_version:
+        response.headers['X-Catalog-Version'] = snapshot.catalog_version
+    return response
+
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    """Count requests and time them per route template and status"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get('route')
+    path = route.path if route is not None else 'unmatched'
+    metrics.inc('requests_total', method=request.method, route=path, status=response.status_code)
+    metrics.observe('request_seconds', time.perf_counter() - started, route=path)
+    return response
+
+# PowerUsage buckets from classify_power_usage; the store keeps their index
+POWER_BUCKETS = ('high', 'medium', 'low')
+
+def group_rows(codes, size):
+    """Row ids for each code in range(size), ascending within each group"""
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes, minlength=size)
+    return np.split(order, np.cumsum(counts)[:-1]) if size else []
+
+class ProductStore:
+    """
+    Compact, array-backed store of the fields served per product.
+
+    Brand and Application are interned as integer codes into their distinct
+    values and PowerUsage as an index into POWER_BUCKETS; the remaining fields
+    are object arrays, so row(i) is O(1) and never builds a pandas Series.
+    combined_text is kept for deltas and refits; the raw upload records only
+    when RETAIN_RAW_RECORDS is set.
+    """
+    def __init__(self, product_ids, names, brand_codes, brand_values, application_codes,
+                 application_values, power_codes, image_urls, combined_text, raw_records=None):
+        self.product_ids = product_ids
+        self.names = names
+        self.brand_codes = brand_codes
+        self.brand_values = brand_values
+        self.application_codes = application_codes
+        self.application_values = application_values
+        self.power_codes = power_codes
+        self.image_urls = image_urls
+        self.combined_text = combined_text
+        self.raw_records = raw_records
+
+    @classmethod
+    def from_columns(cls, columns, raw_records=None):
+        """Build from a dict of equal-length column lists named like the prepared DataFrame"""
+        def strings(name):
+            return np.asarray(columns[name], dtype=object)
+
+        brand_codes, brand_values = pd.factorize(strings('Brand'))
+        application_codes, application_values = pd.factorize(strings('Application'))
+        power_lookup = {bucket: code for code, bucket in enumerate(POWER_BUCKETS)}
+        power_codes = np.fromiter(
+            (power_lookup.get(power, 1) for power in columns['PowerUsage']),
+            dtype=np.int8,
+            count=len(columns['PowerUsage'])
+        )
+        return cls(
+            product_ids=strings(PRODUCT_ID_COLUMN) if PRODUCT_ID_COLUMN in columns else None,
+            names=strings('Product'),
+            brand_codes=brand_codes.astype(np.int32),
+            brand_values=np.asarray(brand_values, dtype=object),
+            application_codes=application_codes.astype(np.int32),
+            application_values=np.asarray(application_values, dtype=object),
+            power_codes=power_codes,
+            image_urls=strings('Image_URL'),
+            combined_text=strings('combined_text'),
+            raw_records=raw_records,
+        )
+
+    @classmethod
+    def from_frame(cls, df, raw_records=None):
+        """Build from a DataFrame returned by prepare_products_frame"""
+        return cls.from_columns(
+            {name: df[name].tolist() for name in ARTIFACT_COLUMNS if name in df.columns},
+            raw_records
+        )
+
+    def to_columns(self):
+        """Expand back into plain column lists (the artifact format)"""
+        columns = {
+            'Product': self.names.tolist(),
+            'Brand': self.brand_values[self.brand_codes].tolist(),
+            'Application': self.application_values[self.application_codes].tolist(),
+            'PowerUsage': [POWER_BUCKETS[code] for code in self.power_codes],
+            'Image_URL': self.image_urls.tolist(),
+            'combined_text': self.combined_text.tolist(),
+        }
+        if self.product_ids is not None:
+            columns[PRODUCT_ID_COLUMN] = self.product_ids.tolist()
+        return columns
+
+    def __len__(self):
+        return len(self.names)
+
+    def row(self, i):
+        """Served fields of product i"""
+        return {
+            'Product_Name': self.names[i],
+            'Brand': self.brand_values[self.brand_codes[i]],
+            'Application': self.application_values[self.application_codes[i]],
+            'PowerUsage': POWER_BUCKETS[self.power_codes[i]],
+            'Image_URL': self.image_urls[i]
+        }
+
+    def raw_record(self, i):
+        """Original upload record of product i, if raw records are retained"""
+        return self.raw_records[i] if self.raw_records is not None else None
+
+    def take(self, rows):
+        """Store holding only the given rows, in order (code tables are shared)"""
+        return ProductStore(
+            product_ids=self.product_ids[rows] if self.product_ids is not None else None,
+            names=self.names[rows],
+            brand_codes=self.brand_codes[rows],
+            brand_values=self.brand_values,
+            application_codes=self.application_codes[rows],
+            application_values=self.application_values,
+            power_codes=self.power_codes[rows],
+            image_urls=self.image_urls[rows],
+            combined_text=self.combined_text[rows],
+            raw_records=[self.raw_records[i] for i in rows] if self.raw_records is not None else None,
+        )
+
+    def append(self, other):
+        """Store with other's rows after this one's (existing codes are kept, new values appended)"""
+        brand_values, brand_codes = merge_codes(self.brand_values, self.brand_codes, other.brand_values, other.brand_codes)
+        application_values, application_codes = merge_codes(
+            self.application_values, self.application_codes, other.application_values, other.application_codes
+        )
+        raw_records = None
+        if self.raw_records is not None and other.raw_records is not None:
+            raw_records = self.raw_records + other.raw_records
+        return ProductStore(
+            product_ids=np.concatenate([self.product_ids, other.product_ids]) if self.product_ids is not None and other.product_ids is not None else None,
+            names=np.concatenate([self.names, other.names]),
+            brand_codes=brand_codes,
+            brand_values=brand_values,
+            application_codes=application_codes,
+            application_values=application_values,
+            power_codes=np.concatenate([self.power_codes, other.power_codes]),
+            image_urls=np.concatenate([self.image_urls, other.image_urls]),
+            combined_text=np.concatenate([self.combined_text, other.combined_text]),
+            raw_records=raw_records,
+        )
+
+def merge_codes(values, codes, other_values, other_codes):
+    """(values, codes) of both code tables' rows, the first table's codes unchanged"""
+    lookup = {value: code for code, value in enumerate(values)}
+    merged = list(values)
+    mapping = np.empty(len(other_values), dtype=np.int32)
+    for i, value in enumerate(other_values):
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(merged)
+            merged.append(value)
+        mapping[i] = code
+    return np.asarray(merged, dtype=object), np.concatenate([codes, mapping[other_codes]]).astype(np.int32)
+
+@dataclass(frozen=True)
+class Partition:
+    """
+    Precomputed candidates of one (application token, power bucket) filter.
+
+    rows are the catalog rows the filter selects (ascending); queries with a
+    description score them against the shared TF-IDF matrix. ranked and
+    ranked_scores are those rows and their similarities for a query without
+    description, best first.
+    """
+    rows: np.ndarray
+    ranked: np.ndarray
+    ranked_scores: np.ndarray
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    """
+    One immutable, fully built model.
+
+    Reloads build a new snapshot off to the side and publish it with a single
+    reference swap, so a request always sees a product store, vectorizer,
+    matrix and index that belong together and never waits on a reload.
+    ann_index is only built for catalogs larger than ANN_EXACT_THRESHOLD,
+    embedding only when LSA_COMPONENTS is set, and partitions (keyed by
+    application token and power bucket) unless PARTITION_TABLES is off.
+    tfidf_matrix is stored at TFIDF_PRECISION; tfidf_recall is the top-10
+    recall of that storage against float64, measured when it was fit.
+    """
+    products: ProductStore
+    tfidf_vectorizer: 'TfidfVectorizer'
+    tfidf_matrix: Any
+    candidate_index: Dict[str, Any]
+    catalog_version: Optional[str]
+    rows_since_refit: int = 0
+    ann_index: Optional['IVFIndex'] = None
+    embedding: Optional['LSAEmbedding'] = None
+    partitions: Optional[Dict[Any, Partition]] = None
+    tfidf_recall: Optional[float] = None
+
+class ResultCache:
+    """
+    Bounded LRU cache of recommendation results with a TTL.
+
+    Keys include the catalog version, so results computed against an older
+    catalog can never be served; the cache is also cleared on every publish.
+    """
+    def __init__(self, max_size, ttl_seconds):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.entries),
+                "max_size": self.max_size
+            }
+
+# Global cache for products and TF-IDF vectors (the current snapshot)
+model_snapshot = None
 last_updated = None
 
-class RecommendationRequest(BaseModel):
+# Catalog loads and deltas run one at a time on this thread, off the request path
+catalog_builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix='catalog-builder')
+# Serializes publishing; readers never take it
+publish_lock = threading.Lock()
+# Only one request thread at a time schedules a reload of shared artifacts
+sync_lock = threading.Lock()
+# CURRENT pointer last seen and the reload it scheduled (see sync_persisted_model)
+artifact_sync = {'stamp': None, 'reload': None}
+
+# Hot-path and reload instrumentation, served by /api/metrics
+metrics = MetricsRegistry('upbringing_')
+metrics.describe('requests_total', 'HTTP requests by method, route and status')
+metrics.describe('request_seconds', 'HTTP request duration by route')
+metrics.describe('stage_seconds', 'Recommendation stage duration (filter, transform, similarity, top_k, format, serialize)')
+metrics.describe('reload_seconds', 'Model rebuild duration by kind (full, delta, artifacts)')
+metrics.describe('micro_batch_size', 'Recommendation requests scored per micro-batch', buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+# Opt-in sampling profiler: sample interval in ms to start it with the server (0 leaves it
+# off; it can still be toggled through /api/profiler/start and /api/profiler/stop)
+PROFILER_INTERVAL_MS = float(os.getenv('PROFILER_INTERVAL_MS', '0'))
+profiler = SamplingProfiler()
+
+# Field identifying a product across catalog syncs (Zoho "Name", e.g. "PD041")
+PRODUCT_ID_COLUMN = 'Product_ID'
+# Refit TF-IDF from scratch once this fraction of the catalog changed incrementally
+REFIT_DRIFT_RATIO = float(os.getenv('TFIDF_REFIT_DRIFT_RATIO', '0.2'))
+
+# Separators between entries of a multi-value Application field
+APPLICATION_SEPARATORS = r'[,;|/]'
+# Free-text application filters whose substring matches are memoized per snapshot
+SUBSTRING_MEMO_SIZE = 1024
+
+# Repeat-query result cache (size 0 disables it)
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '1024'))
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', '600'))
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+
+# Directory for persisted model artifacts (disabled when empty)
+MODEL_ARTIFACT_DIR = os.getenv('MODEL_ARTIFACT_DIR', '')
+# Engine stamp of the artifacts this server writes and loads
+ARTIFACT_ENGINE = 'python_server'
+# Number of uvicorn worker processes; more than one shares the model via MODEL_ARTIFACT_DIR
+PYTHON_WORKERS = int(os.getenv('PYTHON_WORKERS', '1'))
+DEFAULT_SHARED_ARTIFACT_DIR = '/tmp/upbringing-model'
+# Prepared fields kept in the product store and artifacts, enough to serve and to apply deltas
+ARTIFACT_COLUMNS = [PRODUCT_ID_COLUMN, 'Product', 'Brand', 'Application', 'PowerUsage', 'Image_URL', 'combined_text']
+# Keep the original upload records next to the store (off by default to save memory)
+RETAIN_RAW_RECORDS = os.getenv('RETAIN_RAW_RECORDS', '').lower() in ('1', 'true', 'yes')
+
+# Approximate nearest-neighbour search over the TF-IDF rows (off by default)
+ANN_INDEX = os.getenv('ANN_INDEX', '').lower() in ('1', 'true', 'yes')
+# Number of IVF lists (0: sqrt of the catalog size)
+ANN_LISTS = int(os.getenv('ANN_LISTS', '0'))
+# Lists probed per query: higher is slower but closer to exact
+ANN_NPROBE = int(os.getenv('ANN_NPROBE', '8'))
+# Candidate sets (and catalogs) up to this size are always scored exactly
+ANN_EXACT_THRESHOLD = int(os.getenv('ANN_EXACT_THRESHOLD', '5000'))
+
+# Catalog the server pulls by itself: a JSON file path or an http(s) URL such as
+# the Node /api/products/all endpoint (disabled when empty)
+CATALOG_SOURCE = os.getenv('CATALOG_SOURCE', '')
+# Seconds between syncs, first retry delay after a failure (doubling), and its cap
+CATALOG_SYNC_INTERVAL = float(os.getenv('CATALOG_SYNC_INTERVAL', '300'))
+CATALOG_SYNC_RETRY = float(os.getenv('CATALOG_SYNC_RETRY', '5'))
+CATALOG_SYNC_MAX_BACKOFF = float(os.getenv('CATALOG_SYNC_MAX_BACKOFF', '600'))
+CATALOG_SYNC_TIMEOUT = float(os.getenv('CATALOG_SYNC_TIMEOUT', '30'))
+
+# Dimensions of the dense LSA embedding behind mode="semantic" (0 disables it)
+LSA_COMPONENTS = int(os.getenv('LSA_COMPONENTS', '0'))
+# Per-request similarity modes: sparse TF-IDF cosine, or cosine in the LSA space
+SIMILARITY_MODES = ('tfidf', 'semantic')
+
+# Precompute the candidates and description-free ranking of every (application token,
+# power) filter on each rebuild. Costs row ids and scores only (about 24 bytes per row
+# and token it lists); the TF-IDF rows stay in the shared matrix
+PARTITION_TABLES = os.getenv('PARTITION_TABLES', '1').lower() in ('1', 'true', 'yes')
+
+# Storage of the (L2-normalized) TF-IDF rows: float64, float32 (half the data memory,
+# scores within 1e-7) or int8 with a per-row scale (an eighth, approximate ranking)
+TFIDF_PRECISION = os.getenv('TFIDF_PRECISION', 'float64').lower()
+# Catalog rows used as sample queries to check reduced-precision rankings after a fit
+TFIDF_RECALL_SAMPLE = int(os.getenv('TFIDF_RECALL_SAMPLE', '64'))
+
+# Concurrent /api/recommendations requests are coalesced into micro-batches scored in
+# one pass: most requests per batch, longest wait (ms) for a batch to fill, and threads
+# scoring batches
+MICRO_BATCH_SIZE = int(os.getenv('MICRO_BATCH_SIZE', '32'))
+MICRO_BATCH_WAIT_MS = float(os.getenv('MICRO_BATCH_WAIT_MS', '2'))
+MICRO_BATCH_WORKERS = int(os.getenv('MICRO_BATCH_WORKERS', '1'))
+# Requests waiting for a batch beyond which new ones get 429 (0 queues without limit)
+MICRO_BATCH_QUEUE = int(os.getenv('MICRO_BATCH_QUEUE', '256'))
+# A batch scores all queries with one query x catalog product (instead of per-query
+# candidate scoring) once their candidates add up to 1/BATCH_PRODUCT_RATIO of the catalog
+BATCH_PRODUCT_RATIO = 4
+
+# Bind and answer /api/health right away, importing pandas/sklearn and loading the
+# persisted model on the builder thread (0 does both before the server starts)
+FAST_START = os.getenv('FAST_START', '1').lower() in ('1', 'true', 'yes')
+
+class RecommendationQuery(BaseModel):
     application: str
     power: str
     description: str
     count: int = 10
+    mode: str = 'tfidf'
+
+class RecommendationRequest(RecommendationQuery):
     products: List[Dict[str, Any]] = []
 
+class BatchRecommendationRequest(BaseModel):
+    queries: List[RecommendationQuery]
+
+class ProductDelta(BaseModel):
+    upsert: List[Dict[str, Any]] = []
+    delete: List[Any] = []
+
 class Product(BaseModel):
     Product_Name: str
     Brand: str
@@ -51,23 +492,267 @@ class Product(BaseModel):
     Similarity_Score: float
     Image_URL: str = ""
 
-def determine_power_usage(motor_rating):
-    """Classify power usage based on motor rating"""
-    try:
-        rating = float(str(motor_rating).split('/')[0].strip())
-        if rating >= 5.5:
-            return 'high'
-        elif rating >= 2.0:
-            return 'medium'
-        else:
-            return 'low'
-    except:
-        return 'medium'
+def application_tokens(value):
+    """Entries of a (lowercased) Application value, split on APPLICATION_SEPARATORS"""
+    tokens = {token.strip() for token in re.split(APPLICATION_SEPARATORS, value)}
+    tokens.discard('')
+    return tokens
+
+def merge_rows(groups):
+    """Ascending union of disjoint ascending row id arrays"""
+    return groups[0] if len(groups) == 1 else np.sort(np.concatenate(groups))
 
-def preprocess_products(products):
-    """Preprocess products and cache TF-IDF vectors"""
-    global products_df, tfidf_vectorizer, tfidf_matrix
+def rows_containing(candidate_index, text):
+    """
+    Row ids whose Application value contains text as a substring.
 
+    Serves free-text applications that are not an indexed token: one scan over
+    the distinct values, memoized per text for the life of the index.
+    """
+    memo = candidate_index['substrings']
+    rows = memo.get(text)
+    if rows is None:
+        codes = [code for code, value in enumerate(candidate_index['application_values']) if text in value]
+        rows = np.flatnonzero(np.isin(candidate_index['application_codes'], codes))
+        if len(memo) >= SUBSTRING_MEMO_SIZE:
+            memo.clear()
+        memo[text] = rows
+    return rows
+
+def contained_tokens(text, tokens, lengths):
+    """Members of the token set (of the given lengths) that occur in text"""
+    return tokens.intersection(
+        text[start:start + length]
+        for length in lengths
+        for start in range(len(text) - length + 1)
+    )
+
+def build_candidate_index(store):
+    """
+    Build inverted indexes from application tokens and power buckets to row ids.
+
+    The keys are the separator-split entries of the Application values; each
+    maps to the rows whose value contains it as a substring (exactly what
+    rows_containing() returns for it). Other applications fall back to
+    rows_containing().
+    """
+    values = store.application_values
+    value_rows = group_rows(store.application_codes, len(values))
+    token_codes = {}
+    for code, rows in enumerate(value_rows):
+        if len(rows) == 0:
+            continue
+        for token in application_tokens(values[code]):
+            token_codes.setdefault(token, []).append(code)
+
+    # A token holds no separator and no outer whitespace, so a value contains
+    # it exactly when one of the value's own tokens does
+    tokens = set(token_codes)
+    lengths = {len(token) for token in tokens}
+    matched = {token: set() for token in tokens}
+    for token, codes in token_codes.items():
+        for inner in contained_tokens(token, tokens, lengths):
+            matched[inner].update(codes)
+
+    return {
+        'applications': {
+            token: merge_rows([value_rows[code] for code in sorted(codes)])
+            for token, codes in matched.items()
+        },
+        'power': {
+            bucket: rows
+            for bucket, rows in zip(POWER_BUCKETS, group_rows(store.power_codes, len(POWER_BUCKETS)))
+            if len(rows) > 0
+        },
+        'application_values': values,
+        'application_codes': store.application_codes,
+        'substrings': {},
+    }
+
+def row_remap(keep_rows, size):
+    """New row id of each of size old rows after keeping keep_rows (ascending), -1 if dropped"""
+    remap = np.full(size, -1, dtype=np.int64)
+    remap[keep_rows] = np.arange(len(keep_rows))
+    return remap
+
+def update_candidate_index(base_index, base_store, keep_rows, store):
+    """
+    Carry a candidate index through a delta without rebuilding it.
+
+    store holds base_store's keep_rows followed by the appended rows (with
+    base_store's application codes unchanged). Kept row ids are remapped,
+    appended rows added to the tokens their values contain and to their
+    buckets, and only tokens new to the catalog are matched against every
+    value. Returns (index, tokens whose rows changed).
+    """
+    remap = row_remap(keep_rows, len(base_store))
+    dropped = np.flatnonzero(remap < 0)
+    added = np.arange(len(keep_rows), len(store))
+    values = store.application_values
+    base_applications = base_index['applications']
+
+    # Appended rows by the tokens their values contain (all after the kept rows)
+    value_codes, value_groups = np.unique(store.application_codes[added], return_inverse=True)
+    token_set = set(base_applications)
+    new_tokens = set()
+    for code in value_codes:
+        new_tokens |= application_tokens(values[code]) - token_set
+    lengths = {len(token) for token in token_set}
+    new_applications = {}
+    for code, rows in zip(value_codes, group_rows(value_groups, len(value_codes))):
+        for token in contained_tokens(values[code], token_set, lengths):
+            new_applications.setdefault(token, []).append(added[rows])
+    new_power = group_rows(store.power_codes[added], len(POWER_BUCKETS))
+
+    dropped_tokens = set()
+    for code in np.unique(base_store.application_codes[dropped]):
+        dropped_tokens |= contained_tokens(values[code], token_set, lengths)
+    applications = {}
+    for token, rows in base_applications.items():
+        rows = remap[rows]
+        if token in dropped_tokens:
+            rows = rows[rows >= 0]
+        if token in new_applications:
+            rows = merge_rows([rows] + new_applications[token])
+        if token in dropped_tokens:
+            # Only entries of a value still in the catalog stay keys
+            if not any(token in application_tokens(values[code]) for code in np.unique(store.application_codes[rows])):
+                continue
+        applications[token] = rows
+    for token in new_tokens:
+        codes = [code for code, value in enumerate(values) if token in value]
+        applications[token] = np.flatnonzero(np.isin(store.application_codes, codes))
+
+    power = {}
+    for code, bucket in enumerate(POWER_BUCKETS):
+        rows = remap[base_index['power'].get(bucket, np.empty(0, dtype=np.int64))]
+        rows = np.concatenate([rows[rows >= 0], added[new_power[code]]])
+        if len(rows) > 0:
+            power[bucket] = rows
+
+    index = {
+        'applications': applications,
+        'power': power,
+        'application_values': values,
+        'application_codes': store.application_codes,
+        'substrings': {},
+    }
+    return index, dropped_tokens | set(new_applications) | new_tokens
+
+def build_partitions(store, candidate_index, matrix, vectorizer, tokens=None):
+    """
+    Precompute the (application token, power bucket) filters of every token.
+
+    Queries for a dropdown application then skip filtering, and queries
+    without a description skip scoring too: every (row, token) pair is scored
+    against its token's empty-description query in one vectorized pass and
+    ranked once per token. tokens limits the build to those keys (deltas).
+    Multi-value application strings ("packaging, printing") are left to the
+    regular filter. None when PARTITION_TABLES is off.
+    """
+    if not PARTITION_TABLES:
+        return None
+    applications = sorted(candidate_index['applications'] if tokens is None else tokens)
+    if not applications:
+        return {}
+
+    token_rows = [candidate_index['applications'][application] for application in applications]
+    lengths = np.array([len(rows) for rows in token_rows])
+    pair_rows = np.concatenate(token_rows)
+    pair_tokens = np.repeat(np.arange(len(applications)), lengths)
+    scores = pair_scores(matrix, pair_rows, transform_queries(vectorizer, [('', application) for application in applications]), pair_tokens)
+
+    # Best first within each token, ties by row (as top_k orders them)
+    order = np.lexsort((pair_rows, -scores, pair_tokens))
+    ranked_rows = pair_rows[order]
+    ranked_scores = scores[order]
+    ranked_powers = store.power_codes[ranked_rows]
+
+    partitions = {}
+    bounds = np.concatenate(([0], np.cumsum(lengths)))
+    for i, application in enumerate(applications):
+        rows = token_rows[i]
+        ranked = ranked_rows[bounds[i]:bounds[i + 1]]
+        ranked_score = ranked_scores[bounds[i]:bounds[i + 1]]
+        powers = ranked_powers[bounds[i]:bounds[i + 1]]
+        everything = None
+        for code, power in enumerate(POWER_BUCKETS):
+            matches = powers == code
+            if matches.any():
+                partitions[(application, power)] = Partition(np.sort(ranked[matches]), ranked[matches], ranked_score[matches])
+            else:
+                # No power matches: filter_rows falls back to all the application's rows
+                if everything is None:
+                    everything = Partition(rows, ranked, ranked_score)
+                partitions[(application, power)] = everything
+    return partitions
+
+def update_partitions(base, keep_rows, touched, store, candidate_index, matrix):
+    """
+    Carry the base snapshot's partitions through a delta (see update_candidate_index).
+
+    Partitions of untouched tokens keep their rows, so only their row ids are
+    remapped (the remap preserves order, hence the ranking); touched tokens
+    are rebuilt from the updated index.
+    """
+    if base.partitions is None:
+        return build_partitions(store, candidate_index, matrix, base.tfidf_vectorizer)
+    remap = row_remap(keep_rows, len(base.products))
+
+    partitions = {}
+    carried = {}
+    for (application, power), partition in base.partitions.items():
+        if application in touched:
+            continue
+        moved = carried.get(id(partition))
+        if moved is None:
+            moved = carried[id(partition)] = Partition(remap[partition.rows], remap[partition.ranked], partition.ranked_scores)
+        partitions[(application, power)] = moved
+    rebuilt = [token for token in touched if token in candidate_index['applications']]
+    partitions.update(build_partitions(store, candidate_index, matrix, base.tfidf_vectorizer, rebuilt))
+    return partitions
+
+def build_ann_index(matrix):
+    """IVF index over the TF-IDF rows, or None when disabled or the catalog is small"""
+    if not ANN_INDEX or matrix.shape[0] <= ANN_EXACT_THRESHOLD:
+        return None
+    started = time.perf_counter()
+    index = IVFIndex.build(as_float(matrix), n_lists=ANN_LISTS)
+    print(f"🧭 Built ANN index: {len(index)} lists over {matrix.shape[0]} products in {time.perf_counter() - started:.2f}s", flush=True)
+    return index
+
+def update_ann_index(base, keep_rows, new_matrix, matrix):
+    """Carry the base snapshot's ANN index through a delta (new rows join the nearest lists)"""
+    if base.ann_index is None:
+        return build_ann_index(matrix)
+    if matrix.shape[0] <= ANN_EXACT_THRESHOLD:
+        return None
+    index = base.ann_index.take(keep_rows)
+    if new_matrix is not None:
+        index = index.extend(new_matrix)
+    return index
+
+def build_embedding(matrix):
+    """LSA embedding of the TF-IDF rows, or None when semantic mode is disabled"""
+    if LSA_COMPONENTS <= 0:
+        return None
+    started = time.perf_counter()
+    embedding = LSAEmbedding.fit(as_float(matrix), LSA_COMPONENTS)
+    if embedding is not None:
+        print(f"🧠 Built {embedding.dimensions}-d LSA embedding for {matrix.shape[0]} products in {time.perf_counter() - started:.2f}s", flush=True)
+    return embedding
+
+def update_embedding(base, keep_rows, new_matrix, matrix):
+    """Carry the base snapshot's embedding through a delta (new rows are projected, not refit)"""
+    if base.embedding is None:
+        return build_embedding(matrix)
+    embedding = base.embedding.take(keep_rows)
+    if new_matrix is not None:
+        embedding = embedding.extend(new_matrix)
+    return embedding
+
+def prepare_products_frame(products):
+    """Build the cleaned product DataFrame (with combined_text) from raw records"""
     try:
         df = pd.DataFrame(products)
     except Exception as e:
@@ -96,157 +781,1023 @@ def preprocess_products(products):
             break
 
     if motor_col:
-        df['PowerUsage'] = df[motor_col].apply(determine_power_usage)
+        df['PowerUsage'] = classify_power_usage(df[motor_col])
     else:
         df['PowerUsage'] = 'medium'
 
-    # Clean and lowercase - use apply for robustness
-    df['Application'] = df['Application'].apply(lambda x: str(x).lower() if pd.notna(x) else '')
-    df['PowerUsage'] = df['PowerUsage'].apply(lambda x: str(x).lower() if pd.notna(x) else 'medium')
-    df['Product_Details'] = df['Product_Details'].apply(lambda x: str(x).lower() if pd.notna(x) else '')
-    df['Product'] = df['Product'].apply(lambda x: str(x) if pd.notna(x) else 'Unknown Product')
-    df['Brand'] = df['Brand'].apply(lambda x: str(x) if pd.notna(x) else 'Unknown')
-    df['Image_URL'] = df['Image_URL'].apply(lambda x: str(x) if pd.notna(x) else '')
+    # Clean and lowercase with vectorized string ops
+    df['Application'] = clean_text(df['Application'], lower=True)
+    df['PowerUsage'] = clean_text(df['PowerUsage'], 'medium', lower=True)
+    df['Product_Details'] = clean_text(df['Product_Details'], lower=True)
+    df['Product'] = clean_text(df['Product'], 'Unknown Product')
+    df['Brand'] = clean_text(df['Brand'], 'Unknown')
+    df['Image_URL'] = clean_text(df['Image_URL'])
 
     # Create combined text for TF-IDF
-    df['combined_text'] = df.apply(
-        lambda row: f"{row['Product_Details']} {row['Application']}",
-        axis=1
-    )
+    df['combined_text'] = df['Product_Details'] + ' ' + df['Application']
 
-    products_df = df
+    return df
 
+def fit_snapshot(store, version):
+    """Fit TF-IDF on a product store and build a snapshot with its candidate index"""
     # Pre-compute TF-IDF vectors (THIS IS THE KEY OPTIMIZATION)
     # Only print on first load, not every time
-    if tfidf_matrix is None:
-        print(f"📊 Computing TF-IDF vectors for {len(df)} products...")
-    tfidf_vectorizer = TfidfVectorizer(max_features=500, stop_words='english')
-    tfidf_matrix = tfidf_vectorizer.fit_transform(df['combined_text'])
-    if products_df is None:
-        print(f"✅ TF-IDF vectors cached in memory!")
+    if model_snapshot is None:
+        print(f"📊 Computing TF-IDF vectors for {len(store)} products...")
+    vectorizer = TfidfVectorizer(max_features=500, stop_words='english')
+    matrix = vectorizer.fit_transform(store.combined_text)
+    stored, recall = compact_tfidf(matrix)
+    candidate_index = build_candidate_index(store)
+    return ModelSnapshot(
+        products=store,
+        tfidf_vectorizer=vectorizer,
+        tfidf_matrix=stored,
+        candidate_index=candidate_index,
+        catalog_version=version,
+        ann_index=build_ann_index(matrix),
+        embedding=build_embedding(matrix),
+        partitions=build_partitions(store, candidate_index, stored, vectorizer),
+        tfidf_recall=recall,
+    )
 
-    return df
+def compact_tfidf(matrix):
+    """
+    Store freshly fit TF-IDF rows at TFIDF_PRECISION.
 
-def get_recommendations(application, power, description, count=10):
-    """Get recommendations using cached TF-IDF vectors"""
-    global products_df, tfidf_vectorizer, tfidf_matrix
+    Below float64 the stored rows are checked against the exact ones: sample
+    catalog rows are used as queries and the top-10 recall is logged and
+    returned (None at float64, where it is exact).
+    """
+    stored = compact(matrix, TFIDF_PRECISION)
+    if TFIDF_PRECISION == 'float64':
+        return stored, None
+    sample = np.unique(np.linspace(0, matrix.shape[0] - 1, min(TFIDF_RECALL_SAMPLE, matrix.shape[0])).astype(int))
+    recall = ranking_recall(matrix, stored, matrix[sample])
+    print(
+        f"🎯 {TFIDF_PRECISION} TF-IDF rows: {matrix_nbytes(stored) / 1e6:.2f} MB "
+        f"(float64 {matrix_nbytes(matrix) / 1e6:.2f} MB), top-10 recall {recall:.3f} over {len(sample)} sample queries",
+        flush=True
+    )
+    return stored, recall
+
+def publish_snapshot(snapshot, persist=True):
+    """Make snapshot the one requests see (persisted first, so other workers follow)"""
+    global model_snapshot, last_updated
+
+    if persist:
+        persist_model(snapshot)
+    with publish_lock:
+        model_snapshot = snapshot
+        last_updated = time.time()
+    result_cache.clear()
+
+def persist_model(snapshot):
+    """Write a snapshot to MODEL_ARTIFACT_DIR so new processes start warm"""
+    if not MODEL_ARTIFACT_DIR:
+        return
+    arrays = {}
+    if snapshot.embedding is not None:
+        arrays.update(lsa_components=snapshot.embedding.components, lsa_vectors=snapshot.embedding.vectors)
+    if snapshot.ann_index is not None:
+        arrays.update(ann_centroids=snapshot.ann_index.centroids, ann_row_lists=snapshot.ann_index.row_lists)
+    try:
+        save_model(
+            MODEL_ARTIFACT_DIR,
+            ARTIFACT_ENGINE,
+            snapshot.tfidf_vectorizer,
+            snapshot.tfidf_matrix,
+            snapshot.products.to_columns(),
+            snapshot.catalog_version,
+            {'rows_since_refit': snapshot.rows_since_refit, 'lsa_components': LSA_COMPONENTS, 'ann_lists': ANN_LISTS, 'tfidf_recall': snapshot.tfidf_recall},
+            arrays
+        )
+    except Exception as e:
+        print(f"❌ Error persisting model artifacts: {e}", flush=True)
+
+def load_persisted_snapshot():
+    """
+    Build a snapshot from artifacts saved by a previous process, without refitting.
+
+    None if there are none or they cannot be served (foreign, stale or
+    corrupt), in which case the next catalog load fits from scratch.
+    """
+    if not MODEL_ARTIFACT_DIR:
+        return None
+    ensure_scientific_stack()
+    try:
+        return snapshot_from_artifacts(MODEL_ARTIFACT_DIR)
+    except Exception as e:
+        print(f"❌ Error loading model artifacts: {e}", flush=True)
+        return None
+
+def snapshot_from_artifacts(artifact_dir):
+    """Rebuild the store, indexes and partitions around the current artifacts (None if there are none)"""
+    loaded = load_model(artifact_dir, ARTIFACT_ENGINE)
+    if loaded is None:
+        return None
+
+    vectorizer, matrix, products, meta = loaded
+    store = ProductStore.from_columns(products)
+    recall = meta.get('tfidf_recall')
+    if stored_precision(matrix) != TFIDF_PRECISION:
+        # Saved at another precision: convert (a private copy instead of the shared map)
+        matrix = compact(matrix, TFIDF_PRECISION)
+        recall = None
+
+    # Reuse the saved embedding (memory-mapped) if it was built with the same settings
+    saved = meta['arrays']
+    if LSA_COMPONENTS > 0 and meta.get('lsa_components') == LSA_COMPONENTS and 'lsa_vectors' in saved:
+        embedding = LSAEmbedding(saved['lsa_components'], saved['lsa_vectors'])
+    else:
+        embedding = build_embedding(matrix)
+
+    # Likewise the ANN lists, instead of rerunning k-means in every worker
+    if ANN_INDEX and meta.get('ann_lists') == ANN_LISTS and 'ann_centroids' in saved and matrix.shape[0] > ANN_EXACT_THRESHOLD:
+        ann_index = IVFIndex(saved['ann_centroids'], saved['ann_row_lists'])
+    else:
+        ann_index = build_ann_index(matrix)
+
+    candidate_index = build_candidate_index(store)
+    return ModelSnapshot(
+        products=store,
+        tfidf_vectorizer=vectorizer,
+        tfidf_matrix=matrix,
+        candidate_index=candidate_index,
+        catalog_version=meta['version'],
+        rows_since_refit=meta.get('rows_since_refit', 0),
+        ann_index=ann_index,
+        embedding=embedding,
+        partitions=build_partitions(store, candidate_index, matrix, vectorizer),
+        tfidf_recall=recall,
+    )
+
+def load_persisted_model():
+    """Serve from artifacts saved by a previous process, without refitting"""
+    snapshot = load_persisted_snapshot()
+    if snapshot is None:
+        return False
+    publish_snapshot(snapshot, persist=False)
+    print(f"✅ Loaded {len(snapshot.products)} products from model artifacts (version {snapshot.catalog_version})", flush=True)
+    return True
+
+def sync_persisted_model():
+    """
+    Hot-swap to the catalog another worker published, if it is newer.
+
+    Workers share one artifact directory; whichever worker loads a catalog
+    flips its CURRENT pointer, and every other worker notices here (a stat of
+    the pointer, compared by inode and mtime) and reloads on its builder
+    thread. Callers never wait for that: the current snapshot keeps serving
+    until the new one is swapped in. Returns the pending reload, if any.
+    """
+    # The warm-up loads the artifacts itself (and nothing follows a failed one)
+    if not MODEL_ARTIFACT_DIR or not warmed_up():
+        return None
+    stamp = current_stamp(MODEL_ARTIFACT_DIR)
+    if stamp is not None and stamp != artifact_sync['stamp']:
+        with sync_lock:
+            if stamp != artifact_sync['stamp']:
+                artifact_sync['stamp'] = stamp
+                artifact_sync['reload'] = catalog_builder.submit(reload_persisted_model)
+    reload = artifact_sync['reload']
+    return reload if reload is not None and not reload.done() else None
+
+def reload_persisted_model():
+    """Swap in the artifacts CURRENT names unless they are already served (on the builder thread)"""
+    global model_snapshot, last_updated
+
+    version = current_version(MODEL_ARTIFACT_DIR)
+    current = model_snapshot
+    if version is None or (current is not None and version == current.catalog_version):
+        return
+    with metrics.timer('reload_seconds', kind='artifacts'):
+        snapshot = load_persisted_snapshot()
+    if snapshot is None:
+        return
+    with publish_lock:
+        # Only swap if the pointer did not move on while we were loading
+        if current_version(MODEL_ARTIFACT_DIR) == snapshot.catalog_version:
+            model_snapshot = snapshot
+            last_updated = time.time()
+    result_cache.clear()
 
-    if products_df is None or tfidf_matrix is None:
+def preprocess_products(products, version=None):
+    """Preprocess products and cache TF-IDF vectors (skipped if the catalog is unchanged)"""
+    ensure_scientific_stack()
+    if version is None:
+        version = catalog_fingerprint(products)
+    current = model_snapshot
+    if current is not None and version == current.catalog_version:
+        return current.products
+
+    with metrics.timer('reload_seconds', kind='full'):
+        store = ProductStore.from_frame(
+            prepare_products_frame(products),
+            list(products) if RETAIN_RAW_RECORDS else None
+        )
+        snapshot = fit_snapshot(store, version)
+        publish_snapshot(snapshot)
+    return snapshot.products
+
+def submit_catalog_load(products, version=None):
+    """Rebuild the model for a new catalog on the builder thread; returns a Future"""
+    return catalog_builder.submit(preprocess_products, products, version)
+
+def apply_product_delta(upserts, deletes):
+    """Apply a delta (see splice_product_delta), timed as a reload"""
+    with metrics.timer('reload_seconds', kind='delta'):
+        return splice_product_delta(upserts, deletes)
+
+def splice_product_delta(upserts, deletes):
+    """
+    Upsert/delete products by Product_ID without refitting TF-IDF.
+
+    Changed rows are transformed with the existing vocabulary and spliced into
+    the cached matrix; the candidate index and partitions are updated for the
+    touched rows and tokens only. A full refit only happens once the rows changed since
+    the last fit exceed REFIT_DRIFT_RATIO of the catalog.
+    Returns True if a full refit was performed.
+    """
+    base = model_snapshot
+    if base is None:
         raise ValueError("Products not loaded")
+    if base.products.product_ids is None:
+        raise ValueError(f"Loaded products have no '{PRODUCT_ID_COLUMN}' field")
 
-    # Normalize inputs
-    application = str(application).lower()
-    power = str(power).lower()
-    description = str(description).lower()
+    new_rows = prepare_products_frame(upserts) if upserts else None
+    if new_rows is not None and PRODUCT_ID_COLUMN not in new_rows.columns:
+        raise ValueError(f"Upserted products must have a '{PRODUCT_ID_COLUMN}' field")
+
+    # Upserted ids are dropped first, then re-added from the new records
+    ids_to_drop = {str(product_id) for product_id in deletes}
+    if new_rows is not None:
+        ids_to_drop.update(new_rows[PRODUCT_ID_COLUMN].astype(str))
+
+    current_ids = pd.Series(base.products.product_ids, dtype=object).astype(str)
+    keep_rows = np.flatnonzero(~current_ids.isin(ids_to_drop).to_numpy())
+
+    store = base.products.take(keep_rows)
+    matrix = base.tfidf_matrix[keep_rows]
+    new_matrix = None
+    if new_rows is not None and len(new_rows) > 0:
+        store = store.append(ProductStore.from_frame(new_rows, list(upserts) if RETAIN_RAW_RECORDS else None))
+        new_matrix = base.tfidf_vectorizer.transform(new_rows['combined_text'])
+        matrix = vstack_rows(matrix, new_matrix)
+
+    # A delta's version chains off the version it was applied to
+    new_version = catalog_fingerprint({'base': base.catalog_version, 'upsert': upserts, 'delete': deletes})
+
+    # Drift counts rows actually removed or appended (deletes of unknown ids change nothing)
+    appended = len(store) - len(keep_rows)
+    changed = base.rows_since_refit + (len(base.products) - len(keep_rows)) + appended
+    refit = changed > REFIT_DRIFT_RATIO * max(len(store), 1)
+    if refit:
+        print(f"🔄 Catalog drift {changed}/{len(store)} rows, refitting TF-IDF")
+        snapshot = fit_snapshot(store, new_version)
+    else:
+        candidate_index, touched = update_candidate_index(base.candidate_index, base.products, keep_rows, store)
+        snapshot = ModelSnapshot(
+            products=store,
+            tfidf_vectorizer=base.tfidf_vectorizer,
+            tfidf_matrix=matrix,
+            candidate_index=candidate_index,
+            catalog_version=new_version,
+            rows_since_refit=changed,
+            ann_index=update_ann_index(base, keep_rows, new_matrix, matrix),
+            embedding=update_embedding(base, keep_rows, new_matrix, matrix),
+            partitions=update_partitions(base, keep_rows, touched, store, candidate_index, matrix),
+            tfidf_recall=base.tfidf_recall,
+        )
+    publish_snapshot(snapshot)
+    return refit
 
-    # Filter by application (exact match)
-    app_matches = products_df[products_df['Application'].str.contains(application, na=False, case=False)]
+def submit_product_delta(upserts, deletes):
+    """Apply a delta on the builder thread, after any pending catalog load; returns a Future"""
+    return catalog_builder.submit(apply_product_delta, upserts, deletes)
+
+# State of the background catalog sync (only touched from the event loop)
+catalog_sync = {
+    'records': None,        # Product_ID -> record fingerprint of the last synced catalog
+    'synced_version': None, # fingerprint of the last synced catalog
+    'served_version': None, # snapshot version that catalog produced
+    'last_success': None,
+    'last_error': None,
+    'failures': 0,
+    'leader': False,
+}
+# Open lock file while this process is the worker that syncs (see sync_leadership)
+sync_leader_file = None
+
+def fetch_catalog(source):
+    """Read a catalog (list of product records) from a JSON file or URL"""
+    if source.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(source, timeout=CATALOG_SYNC_TIMEOUT) as response:
+            payload = loads_json(response.read())
+    else:
+        with open(source, 'rb') as f:
+            payload = loads_json(f.read())
+
+    # Accept the bare list or the Node {"success", "count", "data"} envelope
+    if isinstance(payload, dict):
+        payload = payload.get('data', payload.get('products'))
+    if not isinstance(payload, list):
+        raise ValueError(f"Catalog source {source} did not return a list of products")
+    return payload
+
+def sync_leadership():
+    """
+    True if this process should run the catalog sync.
+
+    With several workers sharing MODEL_ARTIFACT_DIR only the one holding a lock
+    on it syncs; the others follow through sync_persisted_model(). The lock is
+    retried every cycle, so another worker takes over if the leader exits.
+    """
+    global sync_leader_file
+
+    if not MODEL_ARTIFACT_DIR:
+        return True
+    if sync_leader_file is not None:
+        return True
+    os.makedirs(MODEL_ARTIFACT_DIR, exist_ok=True)
+    lock_file = open(os.path.join(MODEL_ARTIFACT_DIR, 'SYNC_LOCK'), 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    sync_leader_file = lock_file
+    return True
 
-    if len(app_matches) == 0:
+def record_fingerprints(products):
+    """Product_ID -> content hash of each record, or None if some record has no id"""
+    if not all(PRODUCT_ID_COLUMN in product for product in products):
+        return None
+    return {str(product[PRODUCT_ID_COLUMN]): catalog_fingerprint(product) for product in products}
+
+def diff_catalog(previous, fingerprints, products):
+    """(upserts, deletes) turning the previously synced records into products"""
+    upserts = [
+        product for product in products
+        if previous.get(str(product[PRODUCT_ID_COLUMN])) != fingerprints[str(product[PRODUCT_ID_COLUMN])]
+    ]
+    deletes = [product_id for product_id in previous if product_id not in fingerprints]
+    return upserts, deletes
+
+async def sync_catalog_once():
+    """
+    Pull the catalog from CATALOG_SOURCE and bring the served model up to date.
+
+    Unchanged catalogs are skipped by content hash. When the model being served
+    is the one the previous sync produced, only the changed records are applied
+    as a delta; otherwise (first sync, or someone else loaded a catalog) the
+    model is rebuilt. Either way the work runs on the builder thread.
+    """
+    products = await asyncio.to_thread(fetch_catalog, CATALOG_SOURCE)
+    version = await asyncio.to_thread(catalog_fingerprint, products)
+    fingerprints = await asyncio.to_thread(record_fingerprints, products)
+
+    current = model_snapshot
+    served = current.catalog_version if current is not None else None
+    ours = current is not None and served == catalog_sync['served_version']
+    up_to_date = served == version or (ours and version == catalog_sync['synced_version'])
+
+    if not up_to_date:
+        previous = catalog_sync['records']
+        if ours and previous is not None and fingerprints is not None and current.products.product_ids is not None:
+            upserts, deletes = diff_catalog(previous, fingerprints, products)
+            print(f"🔄 Catalog sync: {len(upserts)} changed, {len(deletes)} removed", flush=True)
+            await asyncio.wrap_future(submit_product_delta(upserts, deletes))
+        else:
+            print(f"🔄 Catalog sync: loading {len(products)} products", flush=True)
+            await asyncio.wrap_future(submit_catalog_load(products, version))
+        served = model_snapshot.catalog_version
+
+    catalog_sync['records'] = fingerprints
+    catalog_sync['synced_version'] = version
+    catalog_sync['served_version'] = served
+
+async def run_catalog_sync():
+    """Sync the catalog now and then every CATALOG_SYNC_INTERVAL, backing off on failures"""
+    print(f"🔄 Catalog sync from {CATALOG_SOURCE} every {CATALOG_SYNC_INTERVAL:g}s", flush=True)
+    await asyncio.wrap_future(start_warm_up())
+    while True:
+        delay = CATALOG_SYNC_INTERVAL
+        catalog_sync['leader'] = sync_leadership()
+        if catalog_sync['leader']:
+            try:
+                await sync_catalog_once()
+                catalog_sync['failures'] = 0
+                catalog_sync['last_success'] = time.time()
+                catalog_sync['last_error'] = None
+            except Exception as e:
+                catalog_sync['failures'] += 1
+                catalog_sync['last_error'] = str(e)
+                delay = min(CATALOG_SYNC_RETRY * 2 ** (catalog_sync['failures'] - 1), CATALOG_SYNC_MAX_BACKOFF)
+                print(f"❌ Catalog sync failed ({catalog_sync['failures']}x), retrying in {delay:g}s: {e}", flush=True)
+        await asyncio.sleep(delay)
+
+def transform_queries(vectorizer, queries):
+    """TF-IDF vectors of (description, application) queries, both lowercased"""
+    return vectorizer.transform([f"{description} {application}" for description, application in queries])
+
+def find_candidates(snapshot, application, power):
+    """(candidate rows, Partition or None) for a lowercased application and power"""
+    partition = snapshot.partitions.get((application, power)) if snapshot.partitions else None
+    if partition is not None:
+        return partition.rows, partition
+    return filter_rows(snapshot.candidate_index, application, power), None
+
+def filter_rows(candidate_index, application, power):
+    """Row ids matching the (lowercased) application, narrowed to power if any match"""
+    # Filter by application (indexed token lookup)
+    app_rows = candidate_index['applications'].get(application)
+    if app_rows is None:
+        # Free-text application: memoized substring match over the distinct values
+        app_rows = rows_containing(candidate_index, application)
+
+    if len(app_rows) == 0:
         # No exact matches, return empty
-        return []
+        return app_rows
 
     # Filter by power usage
-    power_matches = app_matches[app_matches['PowerUsage'] == power]
+    power_rows = candidate_index['power'].get(power)
+    power_matches = np.empty(0, dtype=np.int64)
+    if power_rows is not None:
+        power_matches = np.intersect1d(app_rows, power_rows, assume_unique=True)
 
     if len(power_matches) == 0:
         # No power matches, use all app matches
-        filtered_df = app_matches
+        return app_rows
+    return power_matches
+
+def probe_candidates(snapshot, query_vector, indices, count):
+    """Narrow large candidate sets to the ANN lists nearest the query; small ones stay exact"""
+    if snapshot.ann_index is None or len(indices) <= ANN_EXACT_THRESHOLD:
+        return indices
+    return snapshot.ann_index.search(query_vector, indices, count, ANN_NPROBE)
+
+def check_mode(snapshot, mode):
+    """Validate a per-request similarity mode against what the snapshot can serve"""
+    mode = str(mode).lower()
+    if mode not in SIMILARITY_MODES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of: {', '.join(SIMILARITY_MODES)}")
+    if mode == 'semantic' and snapshot.embedding is None:
+        raise ValueError("Semantic mode is not enabled on this server (set LSA_COMPONENTS)")
+    return mode
+
+def score_candidates(snapshot, query_vector, indices, count, mode):
+    """(candidate rows, similarities) of one TF-IDF query vector under the given mode"""
+    if mode == 'semantic':
+        # Dense LSA space: one matvec, no ANN probing needed
+        return indices, snapshot.embedding.similarities(query_vector, indices)
+    indices = probe_candidates(snapshot, query_vector, indices, count)
+    return indices, row_scores(snapshot.tfidf_matrix[indices], query_vector)
+
+def top_k(similarities, count):
+    """Positions of the `count` highest similarities, best first (ties by position)"""
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+    if count < len(similarities):
+        top = np.argpartition(-similarities, count - 1)[:count]
     else:
-        filtered_df = power_matches
+        top = np.arange(len(similarities))
+    return top[np.lexsort((top, -similarities[top]))]
 
-    if len(filtered_df) == 0:
-        return []
+def build_results(products, indices, similarities, count, raw=False):
+    """
+    Top `count` candidates by similarity.
+
+    indices are the catalog rows the similarities belong to. Returns response
+    rows, or with raw=True the (catalog rows, scores) arrays for internal callers.
+    """
+    with metrics.timer('stage_seconds', stage='top_k'):
+        local = top_k(similarities, count)
+        rows = indices[local]
+        scores = similarities[local]
+    return format_results(products, rows, scores, raw=raw)
+
+def ranked_results(products, partition, count, raw=False):
+    """Top `count` of a partition for a query without description (a lookup, no scoring)"""
+    count = max(count, 0)
+    return format_results(products, partition.ranked[:count], partition.ranked_scores[:count], raw=raw)
+
+def format_results(products, rows, scores, raw=False):
+    """Response rows for ranked catalog rows, or with raw=True the arrays themselves"""
+    if raw:
+        return rows, scores
+
+    with metrics.timer('stage_seconds', stage='format'):
+        results = []
+        for row_id, score in zip(rows.tolist(), scores.tolist()):
+            row = products.row(row_id)
+            results.append({
+                'Product_Name': row['Product_Name'],
+                'Brand': row['Brand'],
+                'Application': row['Application'],
+                'PowerUsage': row['PowerUsage'],
+                'Similarity_Score': score,
+                'Image_URL': row['Image_URL']
+            })
+
+    return results
+
+def get_recommendations(application, power, description, count=10, mode='tfidf', snapshot=None, raw=False):
+    """
+    Get recommendations using cached TF-IDF vectors (raw=True: catalog rows and scores).
+
+    mode="semantic" scores the same query in the LSA embedding space instead.
+    Dropdown applications are served from the precomputed partitions: a
+    TF-IDF query without description is a lookup of the partition's ranking,
+    any other query scores the partition's rows without filtering.
+    """
+    # Read the snapshot once: everything below comes from the same model
+    snapshot = snapshot or model_snapshot
+    if snapshot is None:
+        raise ValueError("Products not loaded")
+    mode = check_mode(snapshot, mode)
+
+    # Normalize inputs
+    application = str(application).lower()
+    power = str(power).lower()
+    description = str(description).lower()
 
     # Get indices of filtered products
-    indices = filtered_df.index.tolist()
+    with metrics.timer('stage_seconds', stage='filter'):
+        indices, partition = find_candidates(snapshot, application, power)
+    if len(indices) == 0:
+        return (indices, np.empty(0)) if raw else []
+    if partition is not None and mode == 'tfidf' and not description.strip():
+        return ranked_results(snapshot.products, partition, count, raw=raw)
 
     # Create query vector using CACHED vectorizer
-    query_text = f"{description} {application}"
-    query_vector = tfidf_vectorizer.transform([query_text])
+    with metrics.timer('stage_seconds', stage='transform'):
+        query_vector = transform_queries(snapshot.tfidf_vectorizer, [(description, application)])
 
-    # Calculate similarity ONLY for filtered products
-    filtered_tfidf = tfidf_matrix[indices]
-    similarities = cosine_similarity(query_vector, filtered_tfidf).flatten()
+    # Calculate similarity ONLY for filtered products (and probed ANN lists)
+    with metrics.timer('stage_seconds', stage='similarity'):
+        indices, similarities = score_candidates(snapshot, query_vector, indices, count, mode)
 
-    # Get top recommendations
-    top_indices_local = similarities.argsort()[::-1][:count]
-    top_indices_global = [indices[i] for i in top_indices_local]
+    return build_results(snapshot.products, indices, similarities, count, raw=raw)
+
+def get_batch_recommendations(queries, snapshot=None, raw=False):
+    """
+    Answer many (application, power, description, count, mode) queries at once.
+
+    All query texts go through one vectorizer transform. When the queries'
+    candidates cover enough of the catalog (BATCH_PRODUCT_RATIO), one sparse
+    query x catalog similarity product is cheaper and each query gathers its
+    candidates from it; otherwise (small batches, narrow filters) each query
+    scores only its own candidates. With an ANN index, or in semantic mode,
+    queries always score their own candidates. raw=True returns (catalog
+    rows, scores) per query instead of formatted rows.
+    """
+    snapshot = snapshot or model_snapshot
+    if snapshot is None:
+        raise ValueError("Products not loaded")
+    if not queries:
+        return []
+
+    normalized = [
+        (str(application).lower(), str(power).lower(), str(description).lower(), count, check_mode(snapshot, mode))
+        for application, power, description, count, mode in queries
+    ]
+    with metrics.timer('stage_seconds', stage='transform'):
+        query_matrix = transform_queries(
+            snapshot.tfidf_vectorizer,
+            [(description, application) for application, _, description, _, _ in normalized]
+        )
+    with metrics.timer('stage_seconds', stage='filter'):
+        candidates = [find_candidates(snapshot, application, power) for application, power, *_ in normalized]
+
+    # Description-free queries on a partition are lookups and need no scoring
+    lookups = [
+        partition is not None and mode == 'tfidf' and not description.strip()
+        for (_, partition), (_, _, description, _, mode) in zip(candidates, normalized)
+    ]
+
+    similarity_matrix = None
+    if snapshot.ann_index is None:
+        exact_rows = sum(
+            len(indices)
+            for (indices, _), (*_, mode), lookup in zip(candidates, normalized, lookups)
+            if mode == 'tfidf' and not lookup
+        )
+        if exact_rows and exact_rows * BATCH_PRODUCT_RATIO >= len(snapshot.products):
+            with metrics.timer('stage_seconds', stage='similarity'):
+                similarity_matrix = score_matrix(query_matrix, snapshot.tfidf_matrix)
 
     results = []
-    for idx in top_indices_global:
-        row = products_df.iloc[idx]
-        results.append({
-            'Product_Name': row['Product'],
-            'Brand': row['Brand'],
-            'Application': row['Application'],
-            'PowerUsage': row['PowerUsage'],
-            'Similarity_Score': float(similarities[top_indices_local.tolist().index(indices.index(idx))]),
-            'Image_URL': row['Image_URL']
-        })
+    for i, (_, _, _, count, mode) in enumerate(normalized):
+        indices, partition = candidates[i]
+        if len(indices) == 0:
+            results.append((indices, np.empty(0)) if raw else [])
+            continue
+        if lookups[i]:
+            results.append(ranked_results(snapshot.products, partition, count, raw=raw))
+            continue
+        with metrics.timer('stage_seconds', stage='similarity'):
+            if similarity_matrix is None or mode != 'tfidf':
+                indices, similarities = score_candidates(snapshot, query_matrix[i], indices, count, mode)
+            else:
+                similarities = similarity_matrix[i].toarray().ravel()[indices]
+        results.append(build_results(snapshot.products, indices, similarities, count, raw=raw))
+
+    return results
+
+def recommendation_cache_key(snapshot, application, power, description, count, mode='tfidf'):
+    """Result cache key; whitespace in the description does not change the TF-IDF query"""
+    return (
+        snapshot.catalog_version,
+        str(application).lower(),
+        str(power).lower(),
+        ' '.join(str(description).lower().split()),
+        int(count),
+        str(mode).lower(),
+    )
+
+def get_cached_batch_recommendations(queries, snapshot=None):
+    """get_batch_recommendations for the queries the result cache cannot answer"""
+    snapshot = snapshot or model_snapshot
+    if snapshot is None:
+        raise ValueError("Products not loaded")
 
+    keys = [recommendation_cache_key(snapshot, *query) for query in queries]
+    results = [result_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        computed = get_batch_recommendations([queries[i] for i in missing], snapshot=snapshot)
+        for i, result in zip(missing, computed):
+            results[i] = result
+            result_cache.put(keys[i], result)
     return results
 
+def answer_queued_queries(queries):
+    """
+    Micro-batch handler: score queued (uncached) queries in one batch pass.
+
+    If the batch fails it is retried query by query, so a bad query only fails
+    its own request.
+    """
+    snapshot = model_snapshot
+    metrics.observe('micro_batch_size', len(queries))
+    try:
+        results = get_batch_recommendations(queries, snapshot=snapshot)
+    except Exception:
+        if len(queries) == 1:
+            raise
+        results = []
+        for query in queries:
+            try:
+                results.append(get_recommendations(*query, snapshot=snapshot))
+            except Exception as e:
+                results.append(e)
+
+    for query, result in zip(queries, results):
+        if not isinstance(result, Exception):
+            result_cache.put(recommendation_cache_key(snapshot, *query), result)
+    return results
+
+recommendation_batcher = MicroBatcher(
+    answer_queued_queries,
+    max_batch_size=MICRO_BATCH_SIZE,
+    max_wait=MICRO_BATCH_WAIT_MS / 1000.0,
+    max_queue=MICRO_BATCH_QUEUE,
+    workers=MICRO_BATCH_WORKERS,
+)
+
+def catalog_sync_status():
+    """Health view of the background catalog sync (None when it is disabled)"""
+    if not CATALOG_SOURCE:
+        return None
+    return {
+        "source": CATALOG_SOURCE,
+        "leader": catalog_sync['leader'],
+        "synced_version": catalog_sync['synced_version'],
+        "served_version": catalog_sync['served_version'],
+        "last_success": catalog_sync['last_success'],
+        "last_error": catalog_sync['last_error'],
+        "failures": catalog_sync['failures'],
+    }
+
+def collected_metrics():
+    """Gauges read at scrape time from the snapshot, cache, sync state and profiler"""
+    snapshot = model_snapshot
+    cache = result_cache.stats()
+    yield ('products', 'gauge', 'Products in the served catalog',
+           [({}, len(snapshot.products) if snapshot is not None else 0)])
+    if snapshot is not None:
+        yield ('catalog_info', 'gauge', 'Served catalog version',
+               [({'version': snapshot.catalog_version}, 1)])
+        yield ('ann_lists', 'gauge', 'IVF lists in the ANN index (0 when exact)',
+               [({}, len(snapshot.ann_index) if snapshot.ann_index is not None else 0)])
+        yield ('semantic_dimensions', 'gauge', 'LSA embedding dimensions (0 when disabled)',
+               [({}, snapshot.embedding.dimensions if snapshot.embedding is not None else 0)])
+        yield ('tfidf_bytes', 'gauge', 'Memory held by the stored TF-IDF rows',
+               [({'precision': stored_precision(snapshot.tfidf_matrix)}, matrix_nbytes(snapshot.tfidf_matrix))])
+    if last_updated is not None:
+        yield ('last_reload_timestamp_seconds', 'gauge', 'Unix time the served snapshot was published',
+               [({}, last_updated)])
+    yield ('result_cache_lookups_total', 'counter', 'Result cache lookups by outcome',
+           [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])])
+    yield ('result_cache_entries', 'gauge', 'Cached results',
+           [({}, cache['size'])])
+    yield ('result_cache_max_entries', 'gauge', 'Result cache capacity',
+           [({}, cache['max_size'])])
+    if CATALOG_SOURCE:
+        yield ('catalog_sync_failures', 'gauge', 'Consecutive failed catalog syncs',
+               [({}, catalog_sync['failures'])])
+    batching = recommendation_batcher.stats()
+    yield ('micro_batch_queued', 'gauge', 'Recommendation requests waiting for a micro-batch',
+           [({}, batching['queued'])])
+    yield ('micro_batch_in_flight', 'gauge', 'Micro-batches being scored',
+           [({}, batching['in_flight'])])
+    yield ('micro_batch_shed_total', 'counter', 'Recommendation requests rejected with 429 (queue full)',
+           [({}, batching['shed'])])
+    yield ('profiler_running', 'gauge', 'Whether the sampling profiler is running',
+           [({}, int(profiler.running))])
+    yield ('startup_stage_seconds', 'gauge', 'Seconds spent per startup stage (imports, model load)',
+           [({'stage': stage}, seconds) for stage, seconds in startup_timings.items()])
+
+def encoded_response(raw_request, payload):
+    """Serialize a response body directly (orjson, or MessagePack if accepted), skipping FastAPI's generic encoder"""
+    kind = response_media_type(raw_request.headers.get('accept'))
+    with metrics.timer('stage_seconds', stage='serialize'):
+        content = encode(payload, kind)
+    return Response(content=content, media_type=kind)
+
+def startup_status():
+    """Health view of startup: warm-up state and seconds spent per stage"""
+    warming = start_warm_up()
+    error = warming.exception() if warming.done() else None
+    return {
+        "mode": "fast" if FAST_START else "eager",
+        "state": "warming" if not warming.done() else "failed" if error is not None else "ready",
+        "error": str(error) if error is not None else None,
+        "ready_seconds": startup_ready_seconds,
+        "timings": dict(startup_timings),
+    }
+
 @app.get("/api/health")
-def health_check():
+def health_check(response: Response):
+    """Answers while the warm-up is still running (status "warming"); 503 if it failed"""
+    sync_persisted_model()
+    snapshot = model_snapshot
+    startup = startup_status()
+    if startup["state"] == "failed":
+        response.status_code = 503
     return {
-        "status": "ok",
-        "products_loaded": products_df is not None,
-        "product_count": len(products_df) if products_df is not None else 0,
-        "tfidf_cached": tfidf_matrix is not None
+        "status": {"warming": "warming", "failed": "error"}.get(startup["state"], "ok"),
+        "startup": startup,
+        "products_loaded": snapshot is not None,
+        "product_count": len(snapshot.products) if snapshot is not None else 0,
+        "tfidf_cached": snapshot is not None,
+        "catalog_version": snapshot.catalog_version if snapshot is not None else None,
+        "ann_lists": len(snapshot.ann_index) if snapshot is not None and snapshot.ann_index is not None else 0,
+        "semantic_dimensions": snapshot.embedding.dimensions if snapshot is not None and snapshot.embedding is not None else 0,
+        "partitions": len(snapshot.partitions) if snapshot is not None and snapshot.partitions is not None else 0,
+        "tfidf_precision": stored_precision(snapshot.tfidf_matrix) if snapshot is not None else TFIDF_PRECISION,
+        "tfidf_bytes": matrix_nbytes(snapshot.tfidf_matrix) if snapshot is not None else 0,
+        "tfidf_recall": snapshot.tfidf_recall if snapshot is not None else None,
+        "catalog_sync": catalog_sync_status(),
+        "micro_batch": recommendation_batcher.stats(),
+        "result_cache": result_cache.stats()
     }
 
+@app.get("/api/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition of this worker's metrics"""
+    sync_persisted_model()
+    return PlainTextResponse(metrics.render(collected_metrics()), media_type='text/plain; version=0.0.4')
+
+@app.get("/api/profiler")
+def profiler_report(limit: Optional[int] = None):
+    """Collapsed stacks sampled so far (feed to flamegraph.pl or speedscope)"""
+    return PlainTextResponse(profiler.report(limit))
+
+@app.post("/api/profiler/start")
+def profiler_start(interval_ms: float = 10):
+    if interval_ms <= 0:
+        raise HTTPException(status_code=400, detail="interval_ms must be positive")
+    started = profiler.start(interval_ms)
+    print(f"🔬 Sampling profiler {'started' if started else 'already running'} ({interval_ms}ms)", flush=True)
+    return profiler.status()
+
+@app.post("/api/profiler/stop")
+def profiler_stop():
+    if profiler.stop():
+        print(f"🔬 Sampling profiler stopped", flush=True)
+    return profiler.status()
+
 @app.post("/api/recommendations")
-def recommend(request: RecommendationRequest):
+async def recommend(request: RecommendationRequest, raw_request: Request):
+    """
+    Recommendations for one query.
+
+    Runs on the event loop: cache hits are answered directly and misses wait
+    for the next micro-batch, so concurrent requests share one transform and
+    one similarity product instead of each holding a threadpool thread.
+    """
     try:
+        warming = start_warm_up()
+        if not warming.done():
+            await asyncio.wrap_future(warming)
+        reloading = sync_persisted_model()
+
         # Only update products if explicitly provided (for backward compatibility)
         # In production, products are pre-loaded via /api/load-products endpoint
+        # Resending the already-loaded catalog is a no-op (matched by content hash)
         if request.products and len(request.products) > 0:
-            should_update = products_df is None or len(products_df) != len(request.products)
-            if should_update:
+            version = await asyncio.to_thread(catalog_fingerprint, request.products)
+            current = model_snapshot
+            if current is None or version != current.catalog_version:
                 print(f"🔄 Updating products cache with {len(request.products)} products")
-            preprocess_products(request.products)
+                pending = submit_catalog_load(request.products, version)
+                if current is None:
+                    # Nothing to serve yet, so this request has to wait for the first build
+                    await asyncio.wrap_future(pending)
 
-        # Check if products are loaded
-        if products_df is None:
+        # Check if products are loaded (nothing to serve yet: wait for a pending reload)
+        snapshot = model_snapshot
+        if snapshot is None and reloading is not None:
+            await asyncio.wrap_future(reloading)
+            snapshot = model_snapshot
+        if snapshot is None:
             raise HTTPException(
                 status_code=503,
                 detail="Products not loaded. Please wait for initial product loading to complete."
             )
 
-        # Get recommendations using CACHED vectors (FAST!)
-        results = get_recommendations(
-            request.application,
-            request.power,
-            request.description,
-            request.count
-        )
+        # Get recommendations using CACHED vectors (FAST!), repeat queries from the result cache
+        query = (request.application, request.power, request.description, request.count, request.mode)
+        check_mode(snapshot, request.mode)
+        results = result_cache.get(recommendation_cache_key(snapshot, *query))
+        if results is None:
+            results = await recommendation_batcher.submit(query)
 
-        return {
+        return encoded_response(raw_request, {
             "success": True,
             "count": len(results),
             "data": results
-        }
+        })
 
     except HTTPException:
         raise
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=f"Server busy, retry shortly ({e})", headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # Only log actual errors
         print(f"❌ Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/recommendations/batch")
+def recommend_batch(request: BatchRecommendationRequest, raw_request: Request):
+    """Answer many queries with one transform and one similarity product"""
+    try:
+        start_warm_up().result()
+        reloading = sync_persisted_model()
+        snapshot = model_snapshot
+        if snapshot is None and reloading is not None:
+            reloading.result()
+            snapshot = model_snapshot
+        if snapshot is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Products not loaded. Please wait for initial product loading to complete."
+            )
+
+        batch = get_cached_batch_recommendations(
+            [(query.application, query.power, query.description, query.count, query.mode) for query in request.queries],
+            snapshot=snapshot
+        )
+
+        return encoded_response(raw_request, {
+            "success": True,
+            "count": len(batch),
+            "data": [{"count": len(results), "data": results} for results in batch]
+        })
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/load-products")
-def load_products(products: List[Dict[str, Any]]):
-    """Endpoint to pre-load and cache products"""
+async def load_products(raw_request: Request, background: bool = False):
+    """
+    Endpoint to pre-load and cache products.
+
+    The body is a JSON array of products, or MessagePack / Arrow IPC when sent
+    with that Content-Type; it is decoded in one pass without per-field
+    Pydantic validation. The model is rebuilt on the builder thread while
+    requests keep using the current snapshot; with ?background=true the call
+    returns without waiting.
+    """
+    body = await raw_request.body()
+    try:
+        products = await asyncio.to_thread(decode_catalog, body, raw_request.headers.get('content-type'))
+    except UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid catalog payload: {e}")
+
+    try:
+        await asyncio.wrap_future(start_warm_up())
+        sync_persisted_model()
+        version = await asyncio.to_thread(catalog_fingerprint, products)
+        current = model_snapshot
+        if current is not None and version == current.catalog_version:
+            return {
+                "success": True,
+                "message": f"Catalog unchanged, {len(products)} products already cached",
+                "catalog_version": version
+            }
+
+        pending = submit_catalog_load(products, version)
+        if background:
+            return {
+                "success": True,
+                "message": f"Loading {len(products)} products in background",
+                "catalog_version": version
+            }
+
+        await asyncio.wrap_future(pending)
+        return {
+            "success": True,
+            "message": f"Loaded and cached {len(products)} products",
+            "catalog_version": version
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/update-products")
+def update_products(delta: ProductDelta):
+    """Endpoint to upsert/delete cached products by Product_ID"""
+    start_warm_up().result()
+    reloading = sync_persisted_model()
+    if model_snapshot is None and reloading is not None:
+        reloading.result()
+    if model_snapshot is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Products not loaded. Load the full catalog via /api/load-products first."
+        )
     try:
-        preprocess_products(products)
+        refit = submit_product_delta(delta.upsert, delta.delete).result()
+        snapshot = model_snapshot
         return {
             "success": True,
-            "message": f"Loaded and cached {len(products)} products"
+            "message": f"Upserted {len(delta.upsert)} and deleted {len(delta.delete)} products",
+            "product_count": len(snapshot.products),
+            "refit": refit,
+            "catalog_version": snapshot.catalog_version
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+startup_ready_seconds = None
+# Future of warm_up(), submitted by start_warm_up() from the serving app's lifespan
+warmup = None
+warmup_lock = threading.Lock()
+
+def warm_up():
+    """Import the scientific stack, then start warm from a previous run's artifacts when configured"""
+    global startup_ready_seconds
+
+    ensure_scientific_stack()
+    if MODEL_ARTIFACT_DIR:
+        with startup_stage('model_load'):
+            load_persisted_model()
+    startup_ready_seconds = round(time.perf_counter() - startup_started, 4)
+    print(f"✅ Warm-up finished {startup_ready_seconds:.2f}s after startup", flush=True)
+
+def start_warm_up():
+    """
+    Submit warm_up() once per process and return its Future.
+
+    It runs on the builder thread, so catalog loads queue behind it; requests
+    that need the model wait for it, /api/health does not.
+    """
+    global warmup
+
+    with warmup_lock:
+        if warmup is None:
+            warmup = catalog_builder.submit(warm_up)
+    return warmup
+
+def warmed_up():
+    """True once warm_up() has finished successfully"""
+    return warmup is not None and warmup.done() and warmup.exception() is None
+
+if PROFILER_INTERVAL_MS > 0:
+    profiler.start(PROFILER_INTERVAL_MS)
+
 if __name__ == "__main__":
     import sys
     print("=" * 60, flush=True)
@@ -259,10 +1810,20 @@ if __name__ == "__main__":
     port = 8000
     print(f"📊 Port: {port}", flush=True)
     print(f"📊 Host: 0.0.0.0", flush=True)
+    with startup_stage('uvicorn', "🔍 Importing uvicorn..."):
+        import uvicorn
     print(f"🔄 Starting Uvicorn...", flush=True)
 
     try:
-        uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
+        if PYTHON_WORKERS > 1:
+            # Workers are separate processes: they share the model read-only
+            # through the mmapped artifacts instead of each holding a copy
+            if not MODEL_ARTIFACT_DIR:
+                os.environ['MODEL_ARTIFACT_DIR'] = DEFAULT_SHARED_ARTIFACT_DIR
+            print(f"📊 Workers: {PYTHON_WORKERS} (artifacts: {os.environ['MODEL_ARTIFACT_DIR']})", flush=True)
+            uvicorn.run("python_server:app", host="0.0.0.0", port=port, log_level="info", workers=PYTHON_WORKERS)
+        else:
+            uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
     except Exception as e:
         print(f"❌ FATAL ERROR: {e}", flush=True)
         import traceback
@@ -0,0 +1,84 @@
+"""
+Opt-in sampling profiler for a running server
+
+A daemon thread snapshots every other thread's Python stack at a fixed
+interval and counts identical stacks. The report is in the collapsed-stack
+format ("outer;inner;leaf count" per line) that flamegraph.pl and speedscope
+read directly. Overhead is one sys._current_frames() walk per interval, and
+nothing at all while stopped.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+class SamplingProfiler:
+    def __init__(self):
+        self.samples = Counter()
+        self.sample_count = 0
+        self.interval = 0.01
+        self.started_at = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, interval_ms=10):
+        """Start sampling (clearing previous samples); no-op if already running"""
+        with self.lock:
+            if self.running:
+                return False
+            self.samples = Counter()
+            self.sample_count = 0
+            self.interval = max(interval_ms, 1) / 1000.0
+            self.started_at = time.time()
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name='sampling-profiler', daemon=True)
+            self.thread.start()
+            return True
+
+    def stop(self):
+        """Stop sampling; the collected samples stay available for report()"""
+        with self.lock:
+            if not self.running:
+                return False
+            self.stop_event.set()
+            thread = self.thread
+        thread.join()
+        return True
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+                    frame = frame.f_back
+                stacks.append(';'.join(reversed(stack)))
+            with self.lock:
+                self.samples.update(stacks)
+                self.sample_count += 1
+
+    def status(self):
+        with self.lock:
+            return {
+                'running': self.running,
+                'interval_ms': self.interval * 1000.0,
+                'samples': self.sample_count,
+                'started_at': self.started_at,
+            }
+
+    def report(self, limit=None):
+        """Collapsed stacks, most frequent first"""
+        with self.lock:
+            stacks = self.samples.most_common(limit)
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
@@ -148,6 +148,131 @@ app.post('/api/zoho/leads', async (req, res) => {
   }
 });
 
+/**
+ * Persistent recommendation worker (aitools2.py --serve)
+ * Loads the catalog and trains TF-IDF once, then answers many queries
+ * over newline-delimited JSON instead of spawning Python per request.
+ */
+let recommendationWorker = null;
+let workerCatalog = null;
+let nextWorkerMessageId = 1;
+const pendingWorkerMessages = new Map();
+
+function stopRecommendationWorker(error) {
+  recommendationWorker = null;
+  workerCatalog = null;
+  for (const { reject } of pendingWorkerMessages.values()) {
+    reject(error);
+  }
+  pendingWorkerMessages.clear();
+}
+
+function getRecommendationWorker() {
+  if (recommendationWorker) {
+    return recommendationWorker;
+  }
+
+  // Path to Python script
+  const pythonScript = path.join(__dirname, '..', 'aitools2.py');
+
+  // Determine Python command based on platform
+  // Windows uses 'python', Linux/Mac use 'python3'
+  const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
+
+  console.log(`Starting recommendation worker with ${pythonCommand}`);
+  const worker = spawn(pythonCommand, [pythonScript, '--serve']);
+
+  let stdoutBuffer = '';
+  let stderrTail = '';
+
+  // Each stdout line is one JSON reply carrying the id of its request
+  worker.stdout.on('data', (data) => {
+    stdoutBuffer += data.toString();
+    let newlineIndex;
+    while ((newlineIndex = stdoutBuffer.indexOf('\n')) >= 0) {
+      const line = stdoutBuffer.slice(0, newlineIndex).trim();
+      stdoutBuffer = stdoutBuffer.slice(newlineIndex + 1);
+      if (!line) continue;
+
+      let reply;
+      try {
+        reply = JSON.parse(line);
+      } catch (parseError) {
+        console.error('Invalid recommendation worker output:', line);
+        continue;
+      }
+
+      const pending = pendingWorkerMessages.get(reply.id);
+      if (pending) {
+        pendingWorkerMessages.delete(reply.id);
+        pending.resolve(reply);
+      }
+    }
+  });
+
+  // Keep only the tail of the debug output for error reporting
+  worker.stderr.on('data', (data) => {
+    stderrTail = (stderrTail + data.toString()).slice(-4000);
+  });
+
+  worker.on('close', (code) => {
+    console.error(`Recommendation worker exited with code ${code}:`, stderrTail);
+    if (recommendationWorker === worker) {
+      stopRecommendationWorker(new Error('Recommendation engine exited unexpectedly'));
+    }
+  });
+
+  worker.on('error', (error) => {
+    console.error('Failed to start recommendation worker:', error);
+    if (recommendationWorker === worker) {
+      stopRecommendationWorker(error);
+    }
+  });
+
+  worker.stdin.on('error', (error) => {
+    console.error('Recommendation worker stdin error:', error);
+  });
+
+  recommendationWorker = worker;
+  return worker;
+}
+
+function sendToRecommendationWorker(message) {
+  const worker = getRecommendationWorker();
+  const id = nextWorkerMessageId++;
+
+  return new Promise((resolve, reject) => {
+    pendingWorkerMessages.set(id, { resolve, reject });
+    worker.stdin.write(JSON.stringify({ ...message, id }) + '\n');
+  });
+}
+
+/**
+ * Make sure the worker has trained on this exact catalog array.
+ * getCachedProducts() returns the same array until the cache refreshes,
+ * so the catalog is only resent (and retrained) after a refresh.
+ */
+function ensureWorkerCatalog(products) {
+  if (!workerCatalog || workerCatalog.products !== products) {
+    const catalog = {
+      products,
+      ready: sendToRecommendationWorker({ products }).then((reply) => {
+        if (!reply.success) {
+          throw new Error(reply.message || 'Failed to load products into recommendation engine');
+        }
+        return reply;
+      })
+    };
+    catalog.ready.catch(() => {
+      if (workerCatalog === catalog) {
+        workerCatalog = null;
+      }
+    });
+    workerCatalog = catalog;
+  }
+  return workerCatalog.ready;
+}
+
 /**
  * Get product recommendations using AI with Zoho CRM data
  */
@@ -164,7 +289,6 @@ app.post('/api/recommendations', async (req, res) => {
     }
 
     // Fetch products from Zoho CRM
-    console.log('Fetching products from Zoho CRM...');
     const products = await getCachedProducts();
 
     if (!products || products.length === 0) {
@@ -174,78 +298,30 @@ app.post('/api/recommendations', async (req, res) => {
       });
     }
 
-    console.log(`Loaded ${products.length} products from Zoho`);
-
-    // Path to Python script
-    const pythonScript = path.join(__dirname, '..', 'aitools2.py');
-
-    // Determine Python command based on platform
-    // Windows uses 'python', Linux/Mac use 'python3'
-    const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
-
-    console.log(`Using Python command: ${pythonCommand}`);
-
-    // Spawn Python process with stdin data
-    const pythonProcess = spawn(pythonCommand, [
-      pythonScript,
-      '--application', application,
-      '--power', power,
-      '--description', description,
-      '--count', count.toString(),
-      '--json',
-      '--data-stdin'
-    ]);
-
-    let stdout = '';
-    let stderr = '';
-
-    // Send product data to Python via stdin
-    pythonProcess.stdin.write(JSON.stringify(products));
-    pythonProcess.stdin.end();
-
-    // Collect stdout data
-    pythonProcess.stdout.on('data', (data) => {
-      stdout += data.toString();
-    });
-
-    // Collect stderr data
-    pythonProcess.stderr.on('data', (data) => {
-      stderr += data.toString();
-    });
-
-    // Handle process completion
-    pythonProcess.on('close', (code) => {
-      if (code !== 0) {
-        console.error('Python script error:', stderr);
-        return res.status(500).json({
-          success: false,
-          message: 'Error running recommendation engine',
-          error: stderr
-        });
-      }
-
-      try {
-        const result = JSON.parse(stdout);
-        res.json(result);
-      } catch (parseError) {
-        console.error('JSON parse error:', parseError);
-        console.error('Python output:', stdout);
-        res.status(500).json({
-          success: false,
-          message: 'Error parsing recommendation results',
-          error: parseError.message
-        });
-      }
-    });
+    let result;
+    try {
+      await ensureWorkerCatalog(products);
+      result = await sendToRecommendationWorker({ application, power, description, count });
+    } catch (workerError) {
+      console.error('Recommendation worker error:', workerError);
+      return res.status(500).json({
+        success: false,
+        message: 'Error running recommendation engine',
+        error: workerError.message
+      });
+    }
 
-    // Handle process errors
-    pythonProcess.on('error', (error) => {
-      console.error('Failed to start Python process:', error);
-      res.status(500).json({
+    if (!result.success) {
+      return res.status(500).json({
         success: false,
-        message: 'Failed to start recommendation engine',
-        error: error.message
+        message: 'Error running recommendation engine',
+        error: result.message
       });
+    }
+
+    res.json({
+      success: true,
+      data: result.data
     });
 
   } catch (error) {
@@ -0,0 +1,142 @@
+"""
+Reduced-precision TF-IDF rows and dot-product scoring
+
+TfidfVectorizer L2-normalizes every row and every query, so cosine similarity
+is a plain sparse dot product; cosine_similarity() would renormalize both
+sides on each call. Rows can be stored as float64, float32 (half the data
+memory) or int8 codes with one float32 scale per row (an eighth), always with
+int32 indices. Shared by python_server.py and aitools2.py.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+PRECISIONS = ('float64', 'float32', 'int8')
+
+class QuantizedRows:
+    """
+    int8 CSR codes with a per-row scale: row ~= codes * scale.
+
+    Supports the few operations the servers apply to TF-IDF rows: row
+    selection, shape/nnz and (through dequantize()) conversion back to float.
+    """
+    def __init__(self, codes, scale):
+        self.codes = codes
+        self.scale = scale
+
+    @classmethod
+    def quantize(cls, matrix):
+        """Quantize each row of a CSR matrix to int8 against its largest magnitude"""
+        matrix = sp.csr_matrix(matrix, dtype=np.float32)
+        peaks = np.zeros(matrix.shape[0], dtype=np.float32)
+        lengths = np.diff(matrix.indptr)
+        nonempty = lengths > 0
+        if matrix.nnz:
+            peaks[nonempty] = np.maximum.reduceat(np.abs(matrix.data), matrix.indptr[:-1][nonempty])
+        scale = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+        codes = np.rint(matrix.data / np.repeat(scale, lengths)).astype(np.int8)
+        return cls(int32_csr(sp.csr_matrix((codes, matrix.indices, matrix.indptr), shape=matrix.shape)), scale)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nnz(self):
+        return self.codes.nnz
+
+    @property
+    def nbytes(self):
+        return matrix_nbytes(self.codes) + self.scale.nbytes
+
+    def __getitem__(self, rows):
+        return QuantizedRows(self.codes[rows], self.scale[rows])
+
+    def dequantize(self):
+        """float32 CSR of the (approximate) rows"""
+        data = self.codes.data.astype(np.float32) * np.repeat(self.scale, np.diff(self.codes.indptr))
+        return sp.csr_matrix((data, self.codes.indices, self.codes.indptr), shape=self.codes.shape)
+
+def int32_csr(matrix):
+    """CSR with int32 index arrays (scipy keeps int64 ones once created)"""
+    matrix = sp.csr_matrix(matrix)
+    if matrix.nnz < np.iinfo(np.int32).max:
+        matrix.indices = matrix.indices.astype(np.int32, copy=False)
+        matrix.indptr = matrix.indptr.astype(np.int32, copy=False)
+    return matrix
+
+def compact(matrix, precision):
+    """Store L2-normalized TF-IDF rows at the given precision (one of PRECISIONS)"""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown TF-IDF precision '{precision}', expected one of: {', '.join(PRECISIONS)}")
+    if isinstance(matrix, QuantizedRows):
+        matrix = matrix.dequantize()
+    if precision == 'int8':
+        return QuantizedRows.quantize(matrix)
+    return int32_csr(sp.csr_matrix(matrix).astype(precision, copy=False))
+
+def stored_precision(matrix):
+    """Which of PRECISIONS stored rows are kept at"""
+    return 'int8' if isinstance(matrix, QuantizedRows) else str(matrix.dtype)
+
+def as_float(matrix):
+    """Float CSR view of stored rows, for consumers that need a plain sparse matrix"""
+    return matrix.dequantize() if isinstance(matrix, QuantizedRows) else matrix
+
+def vstack_rows(top, bottom):
+    """Rows of top followed by the rows of bottom, at top's precision"""
+    if isinstance(top, QuantizedRows):
+        bottom = bottom if isinstance(bottom, QuantizedRows) else QuantizedRows.quantize(bottom)
+        return QuantizedRows(int32_csr(sp.vstack([top.codes, bottom.codes], format='csr')), np.concatenate([top.scale, bottom.scale]))
+    return int32_csr(sp.vstack([top, as_float(bottom).astype(top.dtype, copy=False)], format='csr'))
+
+def matrix_nbytes(matrix):
+    """Memory held by the stored rows"""
+    if isinstance(matrix, QuantizedRows):
+        return matrix.nbytes
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+def row_scores(matrix, query_vector):
+    """Similarity of one normalized query (1 x terms, sparse) to every stored row"""
+    if isinstance(matrix, QuantizedRows):
+        return (matrix.codes @ query_vector.toarray().ravel().astype(np.float32)) * matrix.scale
+    return matrix @ query_vector.toarray().ravel().astype(matrix.dtype, copy=False)
+
+def pair_scores(matrix, rows, queries, query_rows, chunk=65536):
+    """Similarity of stored row rows[i] to query query_rows[i] (a row of queries), for each i"""
+    queries = sp.csr_matrix(queries)
+    scores = np.empty(len(rows))
+    for start in range(0, len(rows), chunk):
+        part = slice(start, start + chunk)
+        selected = queries[query_rows[part]]
+        if isinstance(matrix, QuantizedRows):
+            products = matrix.codes[rows[part]].multiply(selected).sum(axis=1)
+            scores[part] = np.asarray(products).ravel() * matrix.scale[rows[part]]
+        else:
+            scores[part] = np.asarray(matrix[rows[part]].multiply(selected).sum(axis=1)).ravel()
+    return scores
+
+def score_matrix(queries, matrix):
+    """(queries x rows) sparse similarities of normalized queries to every stored row"""
+    if isinstance(matrix, QuantizedRows):
+        return sp.csr_matrix((queries @ matrix.codes.T).multiply(matrix.scale[np.newaxis, :]))
+    return sp.csr_matrix(queries @ matrix.T)
+
+def ranking_recall(exact, stored, queries, k=10):
+    """
+    Mean share of the stored rows' top-k that belongs to the exact top-k, per query.
+
+    exact is the float64 matrix the stored rows were made from; queries is a
+    CSR matrix of normalized query vectors (e.g. a sample of catalog rows).
+    A row tied with the exact k-th score counts as correct.
+    """
+    k = min(k, exact.shape[0])
+    if k == 0 or queries.shape[0] == 0:
+        return 1.0
+    exact_scores = score_matrix(queries, exact).toarray()
+    stored_scores = score_matrix(queries, stored).toarray()
+    recalls = []
+    for truth, approx in zip(exact_scores, stored_scores):
+        kth = np.partition(truth, len(truth) - k)[len(truth) - k]
+        found = np.argpartition(-approx, k - 1)[:k]
+        recalls.append(np.count_nonzero(truth[found] >= kth - 1e-12) / k)
+    return float(np.mean(recalls))
@@ -0,0 +1,93 @@
+"""
+Payload encodings shared by python_server.py and aitools2.py
+
+JSON is parsed and written with orjson when it is installed (stdlib json
+otherwise). Catalog uploads may also arrive as MessagePack or as an Arrow IPC
+stream, selected by Content-Type; those need the optional msgpack / pyarrow
+packages, imported on first use so they never slow down startup. Responses
+are MessagePack when the client asks for it and msgpack is installed, JSON
+otherwise.
+"""
+import importlib
+import json
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_TYPE = 'application/json'
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+ARROW_TYPES = ('application/vnd.apache.arrow.stream',)
+
+class UnsupportedMediaType(ValueError):
+    """Payload media type this process cannot decode (or whose package is missing)"""
+
+@lru_cache(maxsize=None)
+def optional_module(name):
+    """Import an optional package on first use; None if it is not installed"""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+def loads_json(data):
+    """Parse JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps_json(obj, sort_keys=False):
+    """Serialize to compact JSON bytes (unknown types fall back to str)"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=str, option=option)
+    # Same bytes as orjson (UTF-8, not \u escapes), so content hashes match with or without it
+    return json.dumps(obj, sort_keys=sort_keys, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+
+def media_type(header):
+    """Bare, lowercased media type of a Content-Type/Accept entry"""
+    return (header or '').split(';')[0].strip().lower()
+
+def decode_catalog(body, content_type):
+    """
+    Decode a catalog upload into a list of product dicts.
+
+    The payload is only checked to be a list of objects; fields are left to
+    catalog preprocessing, so nothing is validated per field here.
+    """
+    kind = media_type(content_type) or JSON_TYPE
+    if kind in MSGPACK_TYPES:
+        msgpack = optional_module('msgpack')
+        if msgpack is None:
+            raise UnsupportedMediaType("MessagePack catalogs need the 'msgpack' package")
+        products = msgpack.unpackb(body, raw=False)
+    elif kind in ARROW_TYPES:
+        arrow_ipc = optional_module('pyarrow.ipc')
+        if arrow_ipc is None:
+            raise UnsupportedMediaType("Arrow catalogs need the 'pyarrow' package")
+        products = arrow_ipc.open_stream(body).read_all().to_pylist()
+    elif kind == JSON_TYPE or kind.endswith('+json'):
+        products = loads_json(body)
+    else:
+        raise UnsupportedMediaType(f"Unsupported catalog content type '{kind}'")
+
+    if not isinstance(products, list) or not all(isinstance(product, dict) for product in products):
+        raise ValueError("Catalog must be a list of product objects")
+    return products
+
+def response_media_type(accept):
+    """MessagePack if the Accept header asks for it and msgpack is installed, else JSON"""
+    for entry in (accept or '').split(','):
+        if media_type(entry) in MSGPACK_TYPES and optional_module('msgpack') is not None:
+            return MSGPACK_TYPES[0]
+    return JSON_TYPE
+
+def encode(obj, kind=JSON_TYPE):
+    """Serialize a response payload in the given media type"""
+    if kind in MSGPACK_TYPES:
+        return optional_module('msgpack').packb(obj, use_bin_type=True)
+    return dumps_json(obj)
@@ -95,7 +95,7 @@ app.get('/api/health', (req, res) => {
  */
 app.post('/api/recommendations', async (req, res) => {
   try {
-    const { application, power, description, count = 10 } = req.body;
+    const { application, power, description, count = 10, mode } = req.body;
 
     if (!application || !power || !description) {
       return res.status(400).json({
@@ -125,11 +125,22 @@ app.post('/api/recommendations', async (req, res) => {
         application,
         power,
         description,
-        count
+        count,
+        // Optional similarity mode ("tfidf" or "semantic"), server default when omitted
+        mode
         // Products NOT sent - already pre-loaded in Python server!
       })
     });
 
+    // Python sheds load with 429 when its batch queue is full; pass it on so clients back off
+    if (response.status === 429) {
+      res.set('Retry-After', response.headers.get('retry-after') || '1');
+      return res.status(429).json({
+        success: false,
+        message: 'Recommendation service is busy, please retry shortly'
+      });
+    }
+
     if (!response.ok) {
       const error = await response.text();
       throw new Error(`Python server error: ${error}`);